@@ -3,7 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_socketio import SocketIO
 from flask_migrate import Migrate
+from sqlalchemy.engine import make_url
 import os
+from app.utils.json_codec import socketio_json, json_provider
 
 # Try to import config, with fallback
 try:
@@ -30,11 +32,25 @@ except ImportError:
 db = SQLAlchemy()
 login_manager = LoginManager()
 migrate = Migrate()
-socketio = SocketIO(cors_allowed_origins="*", ping_timeout=60, ping_interval=25, async_mode='threading', logger=False, engineio_logger=False)
+# Server mode switches to eventlet, the launcher monkey-patches before importing the app
+SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+# Set to a redis:// URL when running several server processes behind a load balancer
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+# WebSocket only: no long-polling fallback, Engine.IO's own pings provide the heartbeat
+socketio = SocketIO(cors_allowed_origins="*", ping_timeout=60, ping_interval=25, async_mode=SOCKETIO_ASYNC_MODE,
+                    transports=['websocket'], message_queue=SOCKETIO_MESSAGE_QUEUE, json=socketio_json,
+                    logger=False, engineio_logger=False)
+
+# Directories already created by an earlier create_app() in this process
+_created_backup_paths = set()
 
 def create_app(config_class=None):
     app = Flask(__name__)
     
+    # Faster jsonify()/get_json() when orjson is installed
+    if json_provider:
+        app.json = json_provider(app)
+    
     # Use provided config class or auto-detect
     if config_class:
         app.config.from_object(config_class)
@@ -42,7 +58,8 @@ def create_app(config_class=None):
         # Check for Railway config first
         try:
             from config_railway import get_config
-            app.config.from_object(get_config())
+            config_class = get_config()
+            app.config.from_object(config_class)
         except ImportError:
             # Fallback to deployment config
             deployment_db_url = deployment_config.get_database_url()
@@ -51,13 +68,40 @@ def create_app(config_class=None):
                 print(f"Using deployment database: {deployment_db_url}")
             else:
                 config_name = os.environ.get('FLASK_ENV', 'default')
-                app.config.from_object(config[config_name])
+                config_class = config[config_name]
+                app.config.from_object(config_class)
+    
+    # Per-environment setup (folders, logging), once the config is loaded
+    if hasattr(config_class, 'init_app'):
+        config_class.init_app(app)
+    
+    # Pool settings for server databases (SQLite manages its own pool)
+    database_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if not database_uri.startswith('sqlite'):
+        engine_options = {
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_pre_ping': True,
+            'pool_recycle': 280,  # Under the idle timeout of typical proxies and hosted databases
+            'pool_use_lifo': True  # Reuse the warmest connections, let idle extras age out
+        }
+        if database_uri.split('://')[0] in ('postgresql', 'postgresql+psycopg2'):
+            # Let psycopg2 batch executemany() calls such as the offline sync
+            engine_options['executemany_mode'] = 'values_plus_batch'
+            # Tagged in pg_stat_activity, with TCP keepalives so dead peers are noticed;
+            # options already given in the URL query win
+            connect_args = {'connect_timeout': 5, 'application_name': 'wikidesk',
+                            'keepalives': 1, 'keepalives_idle': 30}
+            url_options = make_url(database_uri).query
+            engine_options['connect_args'] = {key: value for key, value in connect_args.items()
+                                              if key not in url_options}
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options)
     
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='threading')
+    socketio.init_app(app)  # Reuses the options given to SocketIO() above
     
     # Configure login manager
     login_manager.login_view = 'auth.login'
@@ -65,15 +109,7 @@ def create_app(config_class=None):
     login_manager.login_message_category = 'info'
     
     # Register blueprints
-    from app.routes.auth import auth_bp
-    from app.routes.dashboard import dashboard_bp
-    from app.routes.admin import admin_bp
-    from app.routes.api import api_bp
-    
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    app.register_blueprint(dashboard_bp, url_prefix='/')
-    app.register_blueprint(admin_bp, url_prefix='/admin')
-    app.register_blueprint(api_bp, url_prefix='/api')
+    _register_blueprints(app)
     
     # Import models to ensure they're registered
     from app import models
@@ -87,11 +123,27 @@ def create_app(config_class=None):
     
     # Create backup directory if it doesn't exist
     backup_path = app.config.get('BACKUP_PATH', 'backups')
-    os.makedirs(backup_path, exist_ok=True)
+    if backup_path not in _created_backup_paths:
+        os.makedirs(backup_path, exist_ok=True)
+        _created_backup_paths.add(backup_path)
     
     return app
 
+def _register_blueprints(app):
+    """Import and register the route blueprints"""
+    from app.routes.auth import auth_bp
+    from app.routes.dashboard import dashboard_bp
+    from app.routes.admin import admin_bp
+    from app.routes.api import api_bp
+    
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(dashboard_bp, url_prefix='/')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(api_bp, url_prefix='/api')
+
 @login_manager.user_loader
 def load_user(user_id):
     from app.models.user import User
-    return User.query.get(int(user_id))
\ No newline at end of file
+    # Flask-Login keeps the result for the rest of the request, so role checks
+    # such as current_user.is_admin() only read this already-loaded row
+    return db.session.get(User, int(user_id))
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+App creation, first-boot database setup and serving, shared by the launch scripts
+"""
+import os
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from app import SOCKETIO_ASYNC_MODE, create_app, db, socketio
+from app.models.user import User
+from app.models.courtier import Courtier
+from app.models.entry import upgrade_entries_table
+
+SEED_LOCK_KEY = 0x5749_4B49  # Any constant shared by every worker
+
+# Werkzeug pbkdf2 hashes of the published admin123 / user123 defaults, computed once
+# offline so first boot skips the slow hashing; check_password() accepts them with or
+# without argon2 and upgrades them on first login
+DEFAULT_USERS = {
+    'admin': {
+        'username': 'admin',
+        'email': 'admin@wikidesk.local',
+        'full_name': 'Administrateur',
+        'role': 'admin',
+        'password_hash': 'pbkdf2:sha256:600000$WQsHnSynCoes6925$51b6325215c7770a3bad86c9160f974b9b03a2114b6131e19e9cfc655e9b44e2'
+    },
+    'utilisateur': {
+        'username': 'utilisateur',
+        'email': 'user@wikidesk.local',
+        'full_name': 'Utilisateur Demo',
+        'role': 'user',
+        'password_hash': 'pbkdf2:sha256:600000$wvC5quiMq2xwyczU$63da2094ee77ce7022d7cdb7940c3ed919fb8e4b099f719326bafd192d46c72d'
+    }
+}
+
+DEFAULT_COURTIERS = [
+    'AXA', 'Allianz', 'Generali', 'MAIF',
+    'MACIF', 'MMA', 'Groupama', 'Crédit Agricole', 'Autres'
+]
+
+def _insert_ignoring_duplicates(model):
+    """INSERT that skips rows already present under a unique key instead of failing"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(model).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return sqlite.insert(model).on_conflict_do_nothing()
+    return insert(model).prefix_with('IGNORE', dialect='mysql')
+
+def init_database(app):
+    """Initialize database with default data"""
+    with app.app_context():
+        # Create all tables
+        db.create_all()
+        upgrade_entries_table(db.engine)
+        print("[OK] Tables créées/vérifiées")
+        
+        if db.engine.dialect.name == 'postgresql':
+            # Workers booting together seed one at a time, released at commit
+            db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': SEED_LOCK_KEY})
+        
+        # Already seeded is the usual case, answered in a single round trip
+        has_admin, has_demo_user, has_courtiers = db.session.execute(select(
+            select(User.id).where(User.username == 'admin').exists(),
+            select(User.id).where(User.username == 'utilisateur').exists(),
+            select(Courtier.id).exists()
+        )).one()
+        
+        created = []
+        users = []
+        if not has_admin:
+            users.append(DEFAULT_USERS['admin'])
+            created.append("[OK] Utilisateur admin créé (admin/admin123)")
+        if not has_demo_user:
+            users.append(DEFAULT_USERS['utilisateur'])
+            created.append("[OK] Utilisateur demo créé (utilisateur/user123)")
+        if users:
+            # Straight INSERT with the stored hashes, User() would hash the password again;
+            # a worker that raced past the check above (no advisory lock outside PostgreSQL)
+            # then finds the user there and moves on instead of failing
+            db.session.execute(_insert_ignoring_duplicates(User), users)
+        
+        if not has_courtiers:
+            Courtier.bulk_create([{'name': name} for name in DEFAULT_COURTIERS])
+            created.append(f"[OK] {len(DEFAULT_COURTIERS)} courtiers par défaut ajoutés")
+        
+        db.session.commit()
+        for message in created:
+            print(message)
+
+_app = None
+
+def create_application():
+    """Create the app for this environment and seed its database, once per process"""
+    global _app
+    if _app is None:
+        # Railway-aware config, which picks PostgreSQL when DATABASE_URL is set
+        try:
+            from config_railway import get_config
+            _app = create_app(config_class=get_config())
+        except ImportError:
+            _app = create_app()
+        
+        try:
+            init_database(_app)
+        except Exception as e:
+            print(f"[ERREUR] Initialisation de la base de données : {e}")
+    return _app
+
+def main():
+    """Serve the app with Socket.IO's own server"""
+    app = create_application()
+    port = int(os.environ.get('PORT', 5000))
+    # eventlet serves with its own WSGI server, only Werkzeug needs to be allowed
+    options = {'allow_unsafe_werkzeug': True} if SOCKETIO_ASYNC_MODE == 'threading' else {}
+    
+    if os.environ.get('RAILWAY_ENVIRONMENT') or os.environ.get('DATABASE_URL'):
+        print("[INFO] Running on Railway (Production)")
+        socketio.run(app, host='0.0.0.0', port=port, debug=False, **options)
+    else:
+        print("[INFO] Running locally (Development)")
+        print(f"[INFO] Access at: http://localhost:{port}")
+        socketio.run(app, host='0.0.0.0', port=port, debug=True, **options)
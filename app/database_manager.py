@@ -3,12 +3,16 @@ Database manager for handling PostgreSQL connections and SQLite offline cache
 """
 import sqlite3
 import json
-from datetime import datetime
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, date
+from flask import has_app_context
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError, DBAPIError
 from config.deployment import deployment_config, NetworkConfig
 import logging
 import os
+import random
+import threading
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,11 +22,32 @@ class DatabaseManager:
         self.config = deployment_config.load_config()
         self.offline_db_path = deployment_config.config_dir / "offline_cache.db"
         self.is_online = False
+        self._conn_local = threading.local()
+        self._engine = None
+        self._sync_event = threading.Event()
         self._setup_offline_db()
     
+    def _get_conn(self):
+        """Get this thread's cached connection to the offline cache"""
+        conn = getattr(self._conn_local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.offline_db_path, check_same_thread=False, isolation_level=None)
+            
+            # WAL lets the sync monitor read while request threads write
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA mmap_size=134217728')
+            conn.execute('PRAGMA busy_timeout=5000')
+            
+            conn.row_factory = sqlite3.Row
+            self._conn_local.conn = conn
+        
+        return conn
+    
     def _setup_offline_db(self):
         """Setup SQLite database for offline caching"""
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         # Create offline cache tables
@@ -44,6 +69,12 @@ class DatabaseManager:
             )
         ''')
         
+        # Partial index so pending entries are found without a table scan
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_unsynced
+            ON offline_entries(synced) WHERE synced = 0
+        ''')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sync_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,37 +86,71 @@ class DatabaseManager:
                 error_message TEXT
             )
         ''')
+    
+    def _get_engine(self, app=None):
+        """Get the pooled engine used to reach the main database"""
+        from app import db
+        
+        if app is not None:
+            with app.app_context():
+                return db.engine
+        if has_app_context():
+            return db.engine
         
-        conn.commit()
-        conn.close()
+        # Outside of Flask, keep a single engine instead of one per probe
+        if self._engine is None:
+            self._engine = create_engine(
+                deployment_config.get_database_url(),
+                pool_timeout=NetworkConfig.DB_CONNECTION_TIMEOUT,
+                pool_pre_ping=True
+            )
+        return self._engine
     
-    def test_connection(self):
-        """Test connection to main PostgreSQL database"""
-        try:
-            if not self.config:
-                logger.error("No configuration found")
-                return False
-            
-            db_url = deployment_config.get_database_url()
-            engine = create_engine(db_url, pool_timeout=NetworkConfig.DB_CONNECTION_TIMEOUT)
+    def test_connection(self, app=None, max_retries=3, base_delay=1.0, jitter=0.5):
+        """Test connection to main PostgreSQL database, retrying transient failures"""
+        if not self.config:
+            logger.error("No configuration found")
+            return False
+        
+        for attempt in range(max_retries):
+            try:
+                engine = self._get_engine(app)
+                
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                    self.is_online = True
+                    logger.info("Database connection successful")
+                    return True
             
-            with engine.connect() as conn:
-                result = conn.execute(text("SELECT 1"))
-                self.is_online = True
-                logger.info("Database connection successful")
-                return True
+            except SQLAlchemyError as e:
+                self.is_online = False
                 
-        except SQLAlchemyError as e:
-            self.is_online = False
-            logger.error(f"Database connection failed: {str(e)}")
-            return False
+                # Only connection-level errors are worth retrying
+                if not self._is_transient_error(e) or attempt == max_retries - 1:
+                    logger.error(f"Database connection failed: {str(e)}")
+                    return False
+                
+                delay = min(30, base_delay * 2 ** attempt * (1 + random.random() * jitter))
+                logger.warning(f"Database connection failed (attempt {attempt + 1}/{max_retries}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+        
+        return False
+    
+    @staticmethod
+    def _is_transient_error(error):
+        """Check whether a database error is a recoverable connection failure"""
+        if isinstance(error, OperationalError):
+            return True
+        if isinstance(error, DBAPIError):
+            return error.connection_invalidated or 'connection refused' in str(error).lower()
+        return False
     
     def save_offline_entry(self, entry_data):
         """Save entry to offline cache when main DB is unavailable"""
-        conn = sqlite3.connect(self.offline_db_path)
-        cursor = conn.cursor()
+        conn = self._get_conn()
         
-        cursor.execute('''
+        # Committed before returning, the entry must survive a crash
+        cursor = conn.execute('''
             INSERT INTO offline_entries (
                 user_id, courtier_id, minutes, type_dacte, acte_de_gestion,
                 dossier, client_name, description, entry_date, entry_time, created_at
@@ -103,85 +168,153 @@ class DatabaseManager:
             entry_data.get('entry_time'),
             datetime.now().isoformat()
         ))
-        
         entry_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        
+        # Wake the sync monitor now rather than on its next timeout
+        self._sync_event.set()
         
         logger.info(f"Entry saved offline with ID: {entry_id}")
         return entry_id
     
+    def wait_for_offline_entries(self, timeout=None):
+        """Block until an entry is saved offline or the timeout expires"""
+        triggered = self._sync_event.wait(timeout)
+        self._sync_event.clear()
+        return triggered
+    
+    def has_unsynced_entries(self):
+        """Check whether any offline entry is waiting to be synced"""
+        conn = self._get_conn()
+        row = conn.execute('''
+            SELECT 1 FROM offline_entries WHERE synced = 0 LIMIT 1
+        ''').fetchone()
+        return row is not None
+    
     def get_unsynced_entries(self):
         """Get all entries that haven't been synced to main DB"""
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT * FROM offline_entries WHERE synced = FALSE
+            SELECT id, user_id, courtier_id, minutes, type_dacte, acte_de_gestion,
+                   dossier, client_name, description, entry_date, entry_time
+            FROM offline_entries WHERE synced = 0
         ''')
         
-        entries = cursor.fetchall()
-        conn.close()
-        
-        return entries
+        return cursor.fetchall()
     
     def mark_entry_synced(self, offline_id):
         """Mark an offline entry as synced"""
-        conn = sqlite3.connect(self.offline_db_path)
+        conn = self._get_conn()
         cursor = conn.cursor()
         
         cursor.execute('''
             UPDATE offline_entries SET synced = TRUE WHERE id = ?
         ''', (offline_id,))
+    
+    def mark_entries_synced(self, offline_ids):
+        """Mark several offline entries as synced in a single transaction"""
+        if not offline_ids:
+            return
         
-        conn.commit()
-        conn.close()
+        conn = self._get_conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('''
+                UPDATE offline_entries SET synced = TRUE WHERE id = ?
+            ''', [(offline_id,) for offline_id in offline_ids])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
     
     def sync_offline_entries(self, app):
         """Sync offline entries to main database"""
-        if not self.test_connection():
-            logger.warning("Cannot sync: main database unavailable")
-            return 0
-        
         unsynced_entries = self.get_unsynced_entries()
-        synced_count = 0
+        if not unsynced_entries:
+            return 0
         
         with app.app_context():
             from app.models.entry import Entry
             from app import db
             
-            for entry_data in unsynced_entries:
+            pending = []
+            for row in unsynced_entries:
                 try:
-                    # Create entry in main database
-                    entry = Entry(
-                        user_id=entry_data[1],
-                        courtier_id=entry_data[2],
-                        minutes=entry_data[3],
-                        type_dacte=entry_data[4],
-                        acte_de_gestion=entry_data[5],
-                        dossier=entry_data[6],
-                        client_name=entry_data[7],
-                        description=entry_data[8],
-                        entry_date=datetime.fromisoformat(entry_data[9]).date() if entry_data[9] else None,
-                        entry_time=datetime.fromisoformat(entry_data[10]).time() if entry_data[10] else None
-                    )
-                    
-                    db.session.add(entry)
-                    db.session.commit()
-                    
-                    # Mark as synced
-                    self.mark_entry_synced(entry_data[0])
-                    synced_count += 1
-                    
-                    logger.info(f"Synced offline entry ID: {entry_data[0]}")
-                    
+                    # Plain rows for a Core executemany, bypassing the ORM unit of work
+                    entry_date = datetime.fromisoformat(row['entry_date']).date() if row['entry_date'] else None
+                    entry_time = datetime.fromisoformat(row['entry_time']).time() if row['entry_time'] else None
+                    pending.append((row['id'], {
+                        'user_id': row['user_id'],
+                        'courtier_id': row['courtier_id'],
+                        'minutes': row['minutes'],
+                        'type_dacte': row['type_dacte'],
+                        'acte_de_gestion': row['acte_de_gestion'],
+                        'dossier': row['dossier'],
+                        'client_name': row['client_name'],
+                        'description': row['description'],
+                        'date': entry_date or date.today(),
+                        'time': entry_time or datetime.now().time()
+                    }))
+                
                 except Exception as e:
-                    logger.error(f"Failed to sync entry ID {entry_data[0]}: {str(e)}")
-                    db.session.rollback()
+                    logger.error(f"Failed to sync entry ID {row['id']}: {str(e)}")
+            
+            if not pending:
+                return 0
+            
+            # Insert the whole batch with a single commit
+            entries_insert = insert(Entry.__table__)
+            synced_ids = []
+            try:
+                db.session.execute(entries_insert, [values for _, values in pending])
+                db.session.commit()
+                synced_ids = [offline_id for offline_id, _ in pending]
+                self.is_online = True
+            except OperationalError as e:
+                # pool_pre_ping already probed the connection at checkout
+                logger.warning(f"Cannot sync: main database unavailable ({str(e)})")
+                self.is_online = False
+                db.session.rollback()
+                return 0
+            except IntegrityError:
+                db.session.rollback()
+                synced_ids = self._sync_entries_one_by_one(pending, entries_insert, db)
+            except Exception as e:
+                logger.error(f"Failed to sync offline entries: {str(e)}")
+                db.session.rollback()
+            
+            # Mark as synced
+            self.mark_entries_synced(synced_ids)
+            
+            # Core inserts skip the Entry mapper events that invalidate this
+            if synced_ids:
+                from app.utils.cache import clear_cache
+                clear_cache()
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                for offline_id in synced_ids:
+                    logger.debug("Synced offline entry ID: %s", offline_id)
         
+        synced_count = len(synced_ids)
         logger.info(f"Synced {synced_count} offline entries")
         return synced_count
     
+    def _sync_entries_one_by_one(self, pending, entries_insert, db):
+        """Retry a rejected batch row by row so valid entries still sync"""
+        synced_ids = []
+        
+        for offline_id, values in pending:
+            try:
+                db.session.execute(entries_insert, values)
+                db.session.commit()
+                synced_ids.append(offline_id)
+            except Exception as e:
+                logger.error(f"Failed to sync entry ID {offline_id}: {str(e)}")
+                db.session.rollback()
+        
+        return synced_ids
+    
     def create_backup(self, backup_path):
         """Create database backup (PostgreSQL)"""
         if not self.config:
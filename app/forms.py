@@ -12,16 +12,26 @@ except ImportError:
     # Create a basic email validator fallback
     import re
     
+    _EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\Z')
+    
     class Email:
         def __init__(self, message=None):
             self.message = message or "Invalid email address."
         
         def __call__(self, form, field):
             if field.data:
-                email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-                if not re.match(email_pattern, field.data):
+                if not _EMAIL_RE.match(field.data):
                     raise ValueError(self.message)
 
+# Static choice lists, built once at import and shared by every form instance
+_MINUTES_CHOICES = tuple((i, f'{i} minutes') for i in range(5, 241, 5))
+_TYPE_DACTE_CHOICES = (
+    ('Gestion sinistre', 'Gestion sinistre'),
+    ('Production', 'Production'),
+    ('Bloc retour', 'Bloc retour')
+)
+_ROLE_CHOICES = (('user', 'Utilisateur standard'), ('admin', 'Administrateur'))
+
 class LoginForm(FlaskForm):
     username = StringField('Nom d\'utilisateur', validators=[DataRequired(), Length(min=3, max=80)])
     password = PasswordField('Mot de passe', validators=[DataRequired()])
@@ -31,21 +41,17 @@ class UserRegistrationForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
     full_name = StringField('Nom complet', validators=[DataRequired(), Length(min=2, max=100)])
     password = PasswordField('Mot de passe', validators=[DataRequired(), Length(min=6)])
-    role = SelectField('Rôle', choices=[('user', 'Utilisateur standard'), ('admin', 'Administrateur')], default='user')
+    role = SelectField('Rôle', choices=_ROLE_CHOICES, default='user')
 
 class EntryForm(FlaskForm):
     date = DateField('Date', default=date.today, validators=[DataRequired()])
     time = TimeField('Heure', default=lambda: datetime.now().time(), validators=[DataRequired()])
     courtier_id = SelectField('Courtier', coerce=int, validators=[DataRequired()])
     minutes = SelectField('Nombre de minutes', 
-                         choices=[(i, f'{i} minutes') for i in range(5, 241, 5)],
+                         choices=_MINUTES_CHOICES,
                          coerce=int, validators=[DataRequired()])
     type_dacte = SelectField('Type d\'acte', 
-                           choices=[
-                               ('Gestion sinistre', 'Gestion sinistre'),
-                               ('Production', 'Production'),
-                               ('Bloc retour', 'Bloc retour')
-                           ], validators=[DataRequired()])
+                           choices=_TYPE_DACTE_CHOICES, validators=[DataRequired()])
     acte_de_gestion = StringField('Acte de gestion', validators=[Optional(), Length(max=200)])
     dossier = StringField('Dossier', validators=[Optional(), Length(max=100)])
     client_name = StringField('Nom du client', validators=[Optional(), Length(max=200)])
@@ -6,6 +6,7 @@ import os
 import sys
 import webbrowser
 import time
+import random
 import threading
 from pathlib import Path
 
@@ -13,10 +14,7 @@ from pathlib import Path
 app_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(app_dir))
 
-from app import create_app, socketio, db
-from config.deployment import deployment_config
-from app.database_manager import db_manager
-from app.realtime_sync import realtime_sync
+from config.deployment import deployment_config, NetworkConfig
 
 class WikiDeskLauncher:
     def __init__(self):
@@ -26,6 +24,10 @@ class WikiDeskLauncher:
         
     def initialize_database(self):
         """Initialize database tables"""
+        from app import db
+        from app.database_manager import db_manager
+        from app.models.entry import upgrade_entries_table
+        
         try:
             with self.app.app_context():
                 # Test database connection
@@ -36,6 +38,7 @@ class WikiDeskLauncher:
                 
                 # Create tables if they don't exist
                 db.create_all()
+                upgrade_entries_table(db.engine)
                 
                 # Create default admin user if none exists
                 self.create_default_admin()
@@ -49,6 +52,7 @@ class WikiDeskLauncher:
     
     def create_default_admin(self):
         """Create default admin user if none exists"""
+        from app import db
         from app.models.user import User
         
         admin_exists = User.query.filter_by(role='admin').first()
@@ -79,21 +83,42 @@ class WikiDeskLauncher:
             sync_thread.start()
     
     def monitor_offline_sync(self):
-        """Monitor and sync offline entries periodically"""
+        """Sync offline entries as they are queued, backing off while the server is unreachable"""
+        from app.database_manager import db_manager
+        from app.realtime_sync import realtime_sync
+        
+        failures = 0
+        
         while True:
+            # Wait for a new offline entry, with a periodic retry as safety net
+            if failures:
+                # Exponent capped: 5 * 2**6 already exceeds the 300s ceiling, and an
+                # unbounded one overflows the float during a long outage
+                timeout = min(300, 5 * 2 ** min(failures, 6) * (1 + random.random() * 0.5))
+            else:
+                timeout = NetworkConfig.SYNC_RETRY_INTERVAL
+            db_manager.wait_for_offline_entries(timeout=timeout)
+            
             try:
+                # Cheap local check before paying a round-trip to the server
+                if not db_manager.has_unsynced_entries():
+                    failures = 0
+                    continue
+                
                 with self.app.app_context():
                     synced_count = db_manager.sync_offline_entries(self.app)
                     if synced_count > 0:
+                        failures = 0
                         print(f"📊 Synced {synced_count} offline entries")
                         realtime_sync.broadcast_system_message(
                             f"Synced {synced_count} offline entries",
                             "info"
                         )
+                    else:
+                        failures += 1
             except Exception as e:
+                failures += 1
                 print(f"⚠️  Sync monitor error: {str(e)}")
-            
-            time.sleep(30)  # Check every 30 seconds
     
     def open_browser(self, url, delay=2):
         """Open browser after a delay"""
@@ -108,6 +133,14 @@ class WikiDeskLauncher:
     
     def run(self):
         """Run the WikiDesk application"""
+        if self.is_server_mode:
+            # Green sockets/threads must be patched in before the app is imported
+            import eventlet
+            eventlet.monkey_patch()
+            os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'eventlet')
+        
+        from app import create_app, socketio
+        
         print("🚀 Starting WikiDesk...")
         print("=" * 50)
         
@@ -155,13 +188,18 @@ class WikiDeskLauncher:
             print("=" * 50)
             
             # Run with SocketIO for real-time features
-            socketio.run(
-                self.app,
-                host='0.0.0.0' if self.is_server_mode else host,
-                port=port,
-                debug=False,
-                allow_unsafe_werkzeug=True
-            )
+            if self.is_server_mode:
+                # Served by eventlet's WSGI server rather than Werkzeug
+                socketio.run(self.app, host='0.0.0.0', port=port, debug=False)
+            else:
+                # A single local user is fine on the Werkzeug dev server
+                socketio.run(
+                    self.app,
+                    host=host,
+                    port=port,
+                    debug=False,
+                    allow_unsafe_werkzeug=True
+                )
             
         except KeyboardInterrupt:
             print("\n⏹️  WikiDesk stopped by user")
@@ -1,5 +1,8 @@
 from app import db
+from collections import namedtuple
 from datetime import datetime
+from sqlalchemy import func, insert
+from app.utils.cache import ttl_cached, clear_cache_on_commit, invalidate_on_commit
 
 class Courtier(db.Model):
     __tablename__ = 'courtiers'
@@ -10,8 +13,8 @@ class Courtier(db.Model):
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Relationship with entries
-    entries = db.relationship('Entry', backref='courtier', lazy='dynamic')
+    # Relationship with entries; entry.courtier is batch-loaded (one IN query per result set)
+    entries = db.relationship('Entry', backref=db.backref('courtier', lazy='selectin'), lazy='select')
     
     def __init__(self, name, odoo_so_id=None):
         self.name = name
@@ -19,25 +22,41 @@ class Courtier(db.Model):
     
     def get_total_minutes(self, start_date=None, end_date=None):
         """Get total minutes for this courtier within a date range"""
-        query = self.entries
+        from app.models.entry import Entry
+        
+        query = db.session.query(func.coalesce(func.sum(Entry.minutes), 0)).filter(
+            Entry.courtier_id == self.id
+        )
         
         if start_date:
             query = query.filter(Entry.date >= start_date)
         if end_date:
             query = query.filter(Entry.date <= end_date)
             
-        return sum(entry.minutes for entry in query.all())
+        return query.scalar()
     
     def get_entries_count(self, start_date=None, end_date=None):
         """Get total number of entries for this courtier within a date range"""
-        query = self.entries
+        from app.models.entry import Entry
+        
+        query = db.session.query(func.count(Entry.id)).filter(Entry.courtier_id == self.id)
         
         if start_date:
             query = query.filter(Entry.date >= start_date)
         if end_date:
             query = query.filter(Entry.date <= end_date)
             
-        return query.count()
+        return query.scalar()
+    
+    @classmethod
+    def bulk_create(cls, rows):
+        """Insert several courtiers from dicts in one statement, without building Courtier objects"""
+        if not rows:
+            return
+        
+        db.session.execute(insert(cls), rows)
+        # Bulk inserts never reach the flush that watches courtiers
+        clear_cache_on_commit(db.session)
     
     def to_dict(self):
         return {
@@ -49,4 +68,23 @@ class Courtier(db.Model):
         }
     
     def __repr__(self):
-        return f'<Courtier {self.name}>'
\ No newline at end of file
+        return f'<Courtier {self.name}>'
+
+@ttl_cached(60)
+def get_active_courtiers():
+    """Active courtiers as plain dicts, cached since every entry form needs them"""
+    return [courtier.to_dict() for courtier in Courtier.query.filter_by(is_active=True).all()]
+
+CourtierChoice = namedtuple('CourtierChoice', 'id name')
+
+@ttl_cached(60)
+def get_active_courtier_choices():
+    """(id, name) pairs of active courtiers by name, for entry form choices"""
+    rows = Courtier.query.with_entities(Courtier.id, Courtier.name).filter(
+        Courtier.is_active.is_(True)
+    ).order_by(Courtier.name).all()
+    # Real tuples, which WTForms requires for (value, label) choices
+    return [CourtierChoice(*row) for row in rows]
+
+# Cached choice lists drop once courtier changes are committed
+invalidate_on_commit(Courtier)
@@ -1,6 +1,25 @@
 from app import db
 from datetime import datetime, date
-from sqlalchemy import Index
+from sqlalchemy import Index, String, func, inspect, literal_column, text, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload
+from app.utils.cache import invalidate_on_commit
+from sqlalchemy.sql.expression import FunctionElement
+
+class year_month(FunctionElement):
+    """YYYYMM string for a date column, rendered per dialect"""
+    type = String(6)
+    inherit_cache = True
+
+@compiles(year_month)
+def _compile_year_month(element, compiler, **kw):
+    return f"strftime('%Y%m', {compiler.process(element.clauses, **kw)})"
+
+@compiles(year_month, 'postgresql')
+def _compile_year_month_pg(element, compiler, **kw):
+    # to_char() is only STABLE, generated columns need IMMUTABLE expressions
+    column = compiler.process(element.clauses, **kw)
+    return f"CAST(CAST(EXTRACT(YEAR FROM {column}) * 100 + EXTRACT(MONTH FROM {column}) AS INTEGER) AS VARCHAR(6))"
 
 class Entry(db.Model):
     __tablename__ = 'entries'
@@ -8,7 +27,8 @@ class Entry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, index=True, default=date.today)
     time = db.Column(db.Time, nullable=False, default=lambda: datetime.now().time())
-    period = db.Column(db.String(6), nullable=False, index=True)  # YYYYMM format
+    period = db.Column(db.String(6), db.Computed(year_month(literal_column('date')), persisted=True),
+                       nullable=False, index=True)  # YYYYMM format, computed by the database
     
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -17,16 +37,15 @@ class Entry(db.Model):
     # Entry data
     minutes = db.Column(db.Integer, nullable=False)  # Duration in minutes
     acte_de_gestion = db.Column(db.String(200), nullable=True)  # Free text field
-    acte_type = db.Column(db.Enum('Gestion sinistre', 'Production', 'Bloc retour',
-                                 name='acte_type_enum'), nullable=False, default='Gestion sinistre')
     type_dacte = db.Column(db.Enum('Gestion sinistre', 'Production', 'Bloc retour',
-                                  name='type_dacte'), nullable=True, default='Gestion sinistre')
+                                  name='type_dacte'), nullable=False, default='Gestion sinistre')
+    acte_type = db.synonym('type_dacte')  # Former duplicate column, kept for API compatibility
     dossier = db.Column(db.String(100), nullable=True)
     client_name = db.Column(db.String(200), nullable=True, index=True)
     description = db.Column(db.Text, nullable=True)
     
     # Metadata
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Recent activity queries
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __init__(self, user_id, courtier_id, minutes, type_dacte, 
@@ -35,9 +54,7 @@ class Entry(db.Model):
         self.user_id = user_id
         self.courtier_id = courtier_id
         self.minutes = minutes
-        # Set both fields to ensure database compatibility
         self.type_dacte = type_dacte
-        self.acte_type = type_dacte  # Use same value for database compatibility
         self.acte_de_gestion = acte_de_gestion
         self.dossier = dossier
         self.client_name = client_name
@@ -53,30 +70,28 @@ class Entry(db.Model):
             self.time = entry_time
         else:
             self.time = datetime.now().time()
-        
-        # Generate period (YYYYMM)
-        self.period = self.date.strftime('%Y%m')
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'date': self.date.isoformat(),
-            'time': self.time.strftime('%H:%M:%S'),
-            'period': self.period,
-            'user_id': self.user_id,
-            'courtier_id': self.courtier_id,
-            'minutes': self.minutes,
-            'type_dacte': self.type_dacte,
-            'acte_type': self.acte_type,  # Include for backward compatibility
-            'acte_de_gestion': self.acte_de_gestion,
-            'dossier': self.dossier,
-            'client_name': self.client_name,
-            'description': self.description,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'courtier_name': self.courtier.name if self.courtier else None,
-            'user_name': self.user.full_name if self.user else None
-        }
+        return _entry_dict(self, self.courtier.name if self.courtier else None,
+                           self.user.full_name if self.user else None)
+    
+    @classmethod
+    def bulk_dict(cls, ids):
+        """Serialize several entries from a single column SELECT, without building Entry objects"""
+        from app.models.courtier import Courtier
+        from app.models.user import User
+        
+        if not ids:
+            return []
+        
+        rows = db.session.execute(
+            db.select(*cls.__table__.c, Courtier.name.label('courtier_name'), User.full_name.label('user_name'))
+            .outerjoin(Courtier, Courtier.id == cls.courtier_id)
+            .outerjoin(User, User.id == cls.user_id)
+            .where(cls.id.in_(ids))
+            .order_by(cls.id)
+        ).all()
+        return [_entry_dict(row, row.courtier_name, row.user_name) for row in rows]
     
     @staticmethod
     def get_period_from_date(entry_date):
@@ -86,15 +101,35 @@ class Entry(db.Model):
     @classmethod
     def get_entries_by_period(cls, period, user_id=None):
         """Get all entries for a specific period, optionally filtered by user"""
-        query = cls.query.filter(cls.period == period)
+        # Served by idx_entry_period_user, with names loaded for to_dict()
+        query = cls.query.options(joinedload(cls.courtier), joinedload(cls.user)).filter(cls.period == period)
         if user_id:
             query = query.filter(cls.user_id == user_id)
         return query.all()
     
+    @classmethod
+    def get_page_after(cls, user_id, last_date=None, last_id=None, limit=20):
+        """Get a user's entries older than the last seen (date, id), newest first"""
+        # Keyset pagination: pass the last row's (date, id) rather than an OFFSET
+        # so each page is a seek on idx_entry_user_date_minutes
+        query = cls.query.options(joinedload(cls.courtier), joinedload(cls.user)).filter(cls.user_id == user_id)
+        if last_date is not None and last_id is not None:
+            query = query.filter(tuple_(cls.date, cls.id) < tuple_(last_date, last_id))
+        return query.order_by(cls.date.desc(), cls.id.desc()).limit(limit).all()
+    
+    @classmethod
+    def get_day_totals(cls, user_id, day):
+        """Get (minutes, entry count) for a user on one day, summed by the database"""
+        minutes, count = db.session.query(
+            func.coalesce(func.sum(cls.minutes), 0),
+            func.count(cls.id)
+        ).filter(cls.user_id == user_id, cls.date == day).one()
+        return minutes, count
+    
     @classmethod
     def get_daily_totals(cls, user_id=None, start_date=None, end_date=None):
         """Get daily totals for charting"""
-        query = cls.query
+        query = db.session.query(cls.date, func.sum(cls.minutes))
         
         if user_id:
             query = query.filter(cls.user_id == user_id)
@@ -103,20 +138,123 @@ class Entry(db.Model):
         if end_date:
             query = query.filter(cls.date <= end_date)
             
-        entries = query.all()
+        rows = query.group_by(cls.date).order_by(cls.date).all()
         
-        # Group by date
-        daily_totals = {}
-        for entry in entries:
-            date_str = entry.date.isoformat()
-            daily_totals[date_str] = daily_totals.get(date_str, 0) + entry.minutes
-            
-        return daily_totals
+        return {entry_date.isoformat(): minutes for entry_date, minutes in rows}
+    
+    @classmethod
+    def get_daily_totals_multi_user(cls, start_date, end_date, user_ids=None):
+        """Get daily totals for several users at once, as {user_id: {date: minutes}}"""
+        query = db.session.query(cls.user_id, cls.date, func.sum(cls.minutes)).filter(
+            cls.date.between(start_date, end_date)
+        )
+        if user_ids is not None:
+            query = query.filter(cls.user_id.in_(user_ids))
+        
+        totals = {}
+        for user_id, entry_date, minutes in query.group_by(cls.user_id, cls.date).order_by(cls.date).all():
+            totals.setdefault(user_id, {})[entry_date.isoformat()] = minutes
+        return totals
     
     def __repr__(self):
         return f'<Entry {self.id}: {self.minutes}min on {self.date}>'
 
+def _entry_dict(entry, courtier_name, user_name):
+    """Shared serializer for Entry instances and plain column rows"""
+    return {
+        'id': entry.id,
+        'date': entry.date.isoformat(),
+        'time': entry.time.isoformat(timespec='seconds'),
+        'period': entry.period,
+        'user_id': entry.user_id,
+        'courtier_id': entry.courtier_id,
+        'minutes': entry.minutes,
+        'type_dacte': entry.type_dacte,
+        'acte_type': entry.type_dacte,  # Include for backward compatibility
+        'acte_de_gestion': entry.acte_de_gestion,
+        'dossier': entry.dossier,
+        'client_name': entry.client_name,
+        'description': entry.description,
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+        'updated_at': entry.updated_at.isoformat() if entry.updated_at else None,
+        'courtier_name': courtier_name,
+        'user_name': user_name
+    }
+
 # Create composite indexes for better query performance
-Index('idx_entry_user_date', Entry.user_id, Entry.date)
+# Covers the per-user SUM(minutes) by day queries without touching the table
+Index('idx_entry_user_date_minutes', Entry.user_id, Entry.date, Entry.minutes)
 Index('idx_entry_courtier_date', Entry.courtier_id, Entry.date)
-Index('idx_entry_period_user', Entry.period, Entry.user_id)
\ No newline at end of file
+Index('idx_entry_period_user', Entry.period, Entry.user_id)
+
+# Dashboard aggregates are memoized, drop them once entry changes are committed
+invalidate_on_commit(Entry)
+
+def upgrade_entries_table(engine):
+    """Bring an entries table created by an older release up to the current model"""
+    upgrade_period_column(engine)
+    drop_acte_type_column(engine)
+    create_missing_indexes(engine)
+    drop_superseded_indexes(engine)
+
+def upgrade_period_column(engine):
+    """Turn a legacy app-populated period column into the generated one"""
+    columns = {column['name']: column for column in inspect(engine).get_columns('entries')}
+    if 'period' not in columns or columns['period'].get('computed'):
+        return False
+    
+    period_indexes = [index for index in Entry.__table__.indexes if 'period' in index.columns]
+    expression = year_month(literal_column('date')).compile(dialect=engine.dialect)
+    # SQLite can only add VIRTUAL generated columns to an existing table
+    storage = 'VIRTUAL' if engine.dialect.name == 'sqlite' else 'STORED'
+    
+    with engine.begin() as conn:
+        for index in period_indexes:
+            index.drop(conn, checkfirst=True)
+        conn.execute(text('ALTER TABLE entries DROP COLUMN period'))
+        conn.execute(text(f'ALTER TABLE entries ADD COLUMN period VARCHAR(6) GENERATED ALWAYS AS ({expression}) {storage}'))
+        for index in period_indexes:
+            index.create(conn)
+    
+    return True
+
+def drop_acte_type_column(engine):
+    """Fold the legacy acte_type duplicate into type_dacte"""
+    columns = {column['name'] for column in inspect(engine).get_columns('entries')}
+    if 'acte_type' not in columns:
+        return False
+    
+    with engine.begin() as conn:
+        conn.execute(text('UPDATE entries SET type_dacte = acte_type WHERE type_dacte IS NULL'))
+        conn.execute(text('ALTER TABLE entries DROP COLUMN acte_type'))
+        # SQLite cannot change nullability in place, the model enforces it there
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text('ALTER TABLE entries ALTER COLUMN type_dacte SET NOT NULL'))
+            conn.execute(text('DROP TYPE IF EXISTS acte_type_enum'))
+    
+    return True
+
+def create_missing_indexes(engine):
+    """Create indexes added to the model after the table was first created"""
+    existing = {index['name'] for index in inspect(engine).get_indexes('entries')}
+    missing = [index for index in Entry.__table__.indexes if index.name not in existing]
+    
+    with engine.begin() as conn:
+        for index in missing:
+            index.create(conn)
+        if missing:
+            # Refresh planner statistics so the new indexes get picked up
+            conn.execute(text('ANALYZE entries'))
+    
+    return bool(missing)
+
+def drop_superseded_indexes(engine):
+    """Drop indexes replaced by a wider one in the model"""
+    existing = {index['name'] for index in inspect(engine).get_indexes('entries')}
+    superseded = [name for name in ('idx_entry_user_date',) if name in existing]
+    
+    with engine.begin() as conn:
+        for name in superseded:
+            conn.execute(text(f'DROP INDEX {name}'))
+    
+    return bool(superseded)
\ No newline at end of file
@@ -2,7 +2,24 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from app import db
+from app import db, SOCKETIO_ASYNC_MODE
+from app.utils.cache import ttl_cached
+
+# Prefer Argon2id when argon2-cffi is installed, werkzeug's pbkdf2 otherwise
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+    password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=2, hash_len=32)
+except ImportError:
+    password_hasher = None
+
+def _run_hash(func, *args):
+    """Run a slow hash call without stalling the eventlet hub"""
+    if SOCKETIO_ASYNC_MODE == 'eventlet':
+        # Real OS thread; the hashers release the GIL while they work
+        from eventlet import tpool
+        return tpool.execute(func, *args)
+    return func(*args)
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -17,8 +34,9 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime)
     
-    # Relationship with entries
-    entries = db.relationship('Entry', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    # Relationship with entries; query Entry explicitly, or selectinload(User.entries)
+    # before iterating (including before deleting a user, for the cascade)
+    entries = db.relationship('Entry', backref=db.backref('user', lazy='selectin'), lazy='raise_on_sql', cascade='all, delete-orphan')
     
     def __init__(self, username, email, full_name, password, role='user'):
         self.username = username
@@ -28,85 +46,127 @@ class User(UserMixin, db.Model):
         self.role = role
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        if password_hasher:
+            self.password_hash = _run_hash(password_hasher.hash, password)
+        else:
+            self.password_hash = _run_hash(generate_password_hash, password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not password_hasher:
+            return _run_hash(check_password_hash, self.password_hash, password)
+        
+        if not self.password_hash.startswith('$argon2'):
+            # Legacy werkzeug hash, upgraded on the next commit of the session
+            if not _run_hash(check_password_hash, self.password_hash, password):
+                return False
+            self.set_password(password)
+            return True
+        
+        try:
+            _run_hash(password_hasher.verify, self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        
+        if password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     def is_admin(self):
         return self.role == 'admin'
     
     def get_stats(self, start_date=None, end_date=None):
         """Get user statistics for a date range"""
-        from datetime import date, timedelta
-        from sqlalchemy import func
-        from app.models.entry import Entry
-        
-        query = self.entries
-        
-        if start_date:
-            query = query.filter(Entry.date >= start_date)
-        if end_date:
-            query = query.filter(Entry.date <= end_date)
-            
-        entries = query.all()
-        
-        total_minutes = sum(entry.minutes for entry in entries)
-        total_calls = len(entries)
-        
-        # Today's stats
-        today = date.today()
-        today_entries = self.entries.filter(Entry.date == today).all()
-        today_count = len(today_entries)
-        
-        # This week's stats
-        week_ago = today - timedelta(days=7)
-        week_entries = self.entries.filter(Entry.date >= week_ago, Entry.date <= today).count()
-        
-        # This month's stats
-        month_start = today.replace(day=1)
-        month_entries = self.entries.filter(Entry.date >= month_start, Entry.date <= today).count()
-        
-        # Max daily entries
-        daily_counts = db.session.query(Entry.date, func.count(Entry.id).label('count')).filter(
-            Entry.user_id == self.id
-        ).group_by(Entry.date).all()
-        max_daily = max([row.count for row in daily_counts]) if daily_counts else 0
-        
-        # Average minutes per entry
-        average_minutes = total_minutes / total_calls if total_calls > 0 else 0
-        
-        # Top clients
-        client_stats = {}
-        for entry in entries:
-            if entry.client_name:
-                client_stats[entry.client_name] = client_stats.get(entry.client_name, 0) + entry.minutes
-        
-        top_clients = sorted(client_stats.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        return {
-            'total_minutes': total_minutes,
-            'total_calls': total_calls,
-            'total_entries': total_calls,  # Alias for compatibility
-            'today_entries': today_count,
-            'week_entries': week_entries,
-            'month_entries': month_entries,
-            'max_daily': max_daily,
-            'average_minutes': average_minutes,
-            'top_clients': top_clients
-        }
+        from datetime import date
+        return _user_stats(self.id, start_date, end_date, date.today())
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'full_name': self.full_name,
-            'role': self.role,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_login': self.last_login.isoformat() if self.last_login else None
-        }
+        return _user_dict(self)
+    
+    @classmethod
+    def bulk_dict(cls, ids):
+        """Serialize several users from a single column SELECT, without building User objects"""
+        if not ids:
+            return []
+        
+        rows = db.session.execute(
+            db.select(cls.id, cls.username, cls.email, cls.full_name, cls.role,
+                      cls.is_active, cls.created_at, cls.last_login).where(cls.id.in_(ids))
+        ).all()
+        return [_user_dict(row) for row in rows]
     
     def __repr__(self):
-        return f'<User {self.username}>'
\ No newline at end of file
+        return f'<User {self.username}>'
+
+def _user_dict(user):
+    """Shared serializer for User instances and plain column rows"""
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'full_name': user.full_name,
+        'role': user.role,
+        'is_active': user.is_active,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+        'last_login': user.last_login.isoformat() if user.last_login else None
+    }
+
+@ttl_cached(60)
+def _user_stats(user_id, start_date, end_date, today):
+    """Aggregate a user's entries, memoized briefly since dashboards poll it"""
+    from datetime import timedelta
+    from sqlalchemy import func, case, and_, true, select
+    from app.models.entry import Entry
+    
+    week_ago = today - timedelta(days=7)
+    month_start = today.replace(day=1)
+    
+    range_filters = []
+    if start_date:
+        range_filters.append(Entry.date >= start_date)
+    if end_date:
+        range_filters.append(Entry.date <= end_date)
+    in_range = and_(*range_filters) if range_filters else true()
+    
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+    
+    # Max daily entries, evaluated as a subquery of the main aggregate
+    daily_counts = select(func.count(Entry.id).label('count')).where(
+        Entry.user_id == user_id
+    ).group_by(Entry.date).subquery()
+    max_daily = select(func.coalesce(func.max(daily_counts.c.count), 0)).scalar_subquery()
+    
+    # Range totals and today/week/month buckets in a single pass
+    stats = db.session.query(
+        func.coalesce(func.sum(case((in_range, Entry.minutes), else_=0)), 0),
+        count_where(in_range),
+        count_where(Entry.date == today),
+        count_where(and_(Entry.date >= week_ago, Entry.date <= today)),
+        count_where(and_(Entry.date >= month_start, Entry.date <= today)),
+        max_daily
+    ).filter(Entry.user_id == user_id).one()
+    total_minutes, total_calls, today_count, week_entries, month_entries, max_daily = stats
+    
+    # Average minutes per entry
+    average_minutes = total_minutes / total_calls if total_calls > 0 else 0
+    
+    # Top clients
+    top_clients = db.session.query(Entry.client_name, func.sum(Entry.minutes)).filter(
+        Entry.user_id == user_id,
+        Entry.client_name.isnot(None),
+        Entry.client_name != '',
+        *range_filters
+    ).group_by(Entry.client_name).order_by(func.sum(Entry.minutes).desc(), Entry.client_name).limit(5).all()
+    top_clients = [(client_name, minutes) for client_name, minutes in top_clients]
+    
+    return {
+        'total_minutes': total_minutes,
+        'total_calls': total_calls,
+        'total_entries': total_calls,  # Alias for compatibility
+        'today_entries': today_count,
+        'week_entries': week_entries,
+        'month_entries': month_entries,
+        'max_daily': max_daily,
+        'average_minutes': average_minutes,
+        'top_clients': top_clients
+    }
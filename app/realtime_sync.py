@@ -3,8 +3,14 @@ Real-time synchronization using WebSockets for LAN deployment
 """
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_login import current_user
+from collections import deque
 from datetime import datetime
+from functools import lru_cache
+import json
 import logging
+import os
+import threading
+import time
 
 # Try to import NetworkConfig, but continue without it if not available
 try:
@@ -14,11 +20,31 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Shared registry: connect times in a sorted set, user info in a hash beside it
+CONNECTED_USERS_KEY = 'wikidesk:ws:connected:seen'
+CONNECTED_USERS_INFO_KEY = 'wikidesk:ws:connected:info'
+CONNECTED_USER_TTL = 24 * 3600  # Seconds before a registration no disconnect cleared is dropped
+# Topic room for clients following every user's entries (admin dashboards)
+ENTRIES_TOPIC = 'entries:all'
+ENTRY_BROADCAST_WINDOW = 0.1  # Seconds entry alerts are held to be sent together
+
+@lru_cache(maxsize=4)
+def _iso_second(second):
+    return datetime.fromtimestamp(second).isoformat()
+
+def _timestamp():
+    """Event timestamp, formatted once per second rather than once per emit"""
+    return _iso_second(int(time.time()))
+
 class RealTimeSync:
     def __init__(self, app=None, socketio=None):
         self.app = app
         self.socketio = socketio
         self.connected_users = {}
+        self._redis = None
+        self._pending_entries = deque()
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
         
         if app and socketio:
             self.init_app(app, socketio)
@@ -28,34 +54,42 @@ class RealTimeSync:
         self.app = app
         self.socketio = socketio
         
+        # With several server processes the registry must be shared through Redis
+        message_queue = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+        if message_queue and message_queue.startswith('redis'):
+            import redis
+            self._redis = redis.Redis.from_url(message_queue)
+        
         @socketio.on('connect')
         def handle_connect():
             if current_user.is_authenticated:
                 user_id = str(current_user.id)
-                self.connected_users[user_id] = {
+                self._register_user(user_id, {
                     'user_name': current_user.full_name,
                     'role': current_user.role,
-                    'connected_at': datetime.now().isoformat(),
+                    'connected_at': _timestamp(),
                     'session_id': request.sid if 'request' in globals() else None
-                }
+                })
                 
                 # Join user to their role room
                 join_room(current_user.role)
                 join_room(f"user_{user_id}")
+                if current_user.is_admin():
+                    join_room(ENTRIES_TOPIC)
                 
                 logger.info(f"User {current_user.full_name} connected via WebSocket")
                 
-                # Notify other users
+                # Notify admins
                 emit('user_connected', {
                     'user_name': current_user.full_name,
                     'user_role': current_user.role,
-                    'total_connected': len(self.connected_users)
-                }, broadcast=True, include_self=False)
+                    'total_connected': self.get_connected_users_count()
+                }, to='admin', include_self=False)
                 
                 # Send current user count to new connection
                 emit('connection_status', {
                     'status': 'connected',
-                    'connected_users': len(self.connected_users),
+                    'connected_users': self.get_connected_users_count(),
                     'your_role': current_user.role
                 })
             else:
@@ -67,65 +101,36 @@ class RealTimeSync:
         def handle_disconnect():
             if current_user.is_authenticated:
                 user_id = str(current_user.id)
-                if user_id in self.connected_users:
-                    user_info = self.connected_users.pop(user_id)
-                    
+                if self._unregister_user(user_id):
                     # Leave rooms
                     leave_room(current_user.role)
                     leave_room(f"user_{user_id}")
+                    leave_room(ENTRIES_TOPIC)
                     
                     logger.info(f"User {current_user.full_name} disconnected")
                     
-                    # Notify other users
+                    # Notify admins
                     emit('user_disconnected', {
                         'user_name': current_user.full_name,
-                        'total_connected': len(self.connected_users)
-                    }, broadcast=True)
+                        'total_connected': self.get_connected_users_count()
+                    }, to='admin')
         
         @socketio.on('entry_submitted')
         def handle_entry_submission(data):
             """Handle real-time entry submissions"""
             if current_user.is_authenticated:
-                # Broadcast to all connected users except sender
-                emit('new_entry_alert', {
+                # Admins get alerts in batches so a burst costs one emit per window
+                self._queue_entry_alert({
                     'entry': data,
                     'user_name': current_user.full_name,
-                    'timestamp': datetime.now().isoformat()
-                }, broadcast=True, include_self=False)
+                    'timestamp': _timestamp()
+                })
                 
-                # Update stats for all users
-                emit('stats_update_needed', {}, broadcast=True)
+                # Push the submitter's fresh totals instead of asking every client to re-query
+                emit('stats_updated', self._today_stats(current_user.id), to=f"user_{current_user.id}")
                 
                 logger.info(f"Entry broadcast from {current_user.full_name}")
         
-        @socketio.on('request_stats_update')
-        def handle_stats_request():
-            """Handle stats update requests"""
-            if current_user.is_authenticated:
-                from app.models.entry import Entry
-                from datetime import date
-                
-                # Get today's stats for requesting user
-                today = date.today()
-                today_entries = Entry.query.filter(
-                    Entry.user_id == current_user.id,
-                    Entry.date == today
-                ).all()
-                
-                today_minutes = sum(entry.minutes for entry in today_entries)
-                today_calls = len(today_entries)
-                
-                emit('stats_updated', {
-                    'today_minutes': today_minutes,
-                    'today_calls': today_calls,
-                    'last_update': datetime.now().isoformat()
-                })
-        
-        @socketio.on('ping')
-        def handle_ping():
-            """Handle ping/pong for connection monitoring"""
-            emit('pong')
-        
         @socketio.on('admin_broadcast')
         def handle_admin_broadcast(data):
             """Handle admin broadcasts"""
@@ -133,7 +138,7 @@ class RealTimeSync:
                 emit('admin_message', {
                     'message': data.get('message'),
                     'from': current_user.full_name,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': _timestamp()
                 }, broadcast=True, include_self=False)
                 
                 logger.info(f"Admin broadcast from {current_user.full_name}")
@@ -148,31 +153,31 @@ class RealTimeSync:
                 
                 emit('sync_completed', {
                     'synced_count': synced_count,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': _timestamp()
                 })
                 
                 if synced_count > 0:
-                    # Notify all users that data was synced
+                    # Notify entry subscribers that data was synced
                     emit('data_synced', {
                         'user': current_user.full_name,
                         'count': synced_count
-                    }, broadcast=True, include_self=False)
+                    }, to=ENTRIES_TOPIC, include_self=False)
     
     def broadcast_entry_update(self, entry_data, action='created'):
-        """Broadcast entry updates to all connected clients"""
+        """Send entry updates to entry subscribers and the entry's owner"""
         if self.socketio:
             self.socketio.emit('entry_updated', {
                 'action': action,
                 'entry': entry_data,
-                'timestamp': datetime.now().isoformat()
-            })
+                'timestamp': _timestamp()
+            }, to=[ENTRIES_TOPIC, f"user_{entry_data.get('user_id')}"])
     
     def broadcast_user_stats_update(self, user_id):
         """Broadcast stats update for specific user"""
         if self.socketio:
             self.socketio.emit('user_stats_changed', {
                 'user_id': user_id,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _timestamp()
             }, room=f"user_{user_id}")
     
     def broadcast_system_message(self, message, message_type='info'):
@@ -181,15 +186,89 @@ class RealTimeSync:
             self.socketio.emit('system_message', {
                 'message': message,
                 'type': message_type,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': _timestamp()
             })
     
+    def _queue_entry_alert(self, alert):
+        """Hold an entry alert until the current broadcast window closes"""
+        with self._pending_lock:
+            self._pending_entries.append(alert)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        
+        self.socketio.start_background_task(self._flush_entry_alerts)
+    
+    def _flush_entry_alerts(self):
+        """Send every alert queued during the window as one new_entries_batch"""
+        self.socketio.sleep(ENTRY_BROADCAST_WINDOW)
+        
+        with self._pending_lock:
+            batch = list(self._pending_entries)
+            self._pending_entries.clear()
+            self._flush_scheduled = False
+        
+        if batch:
+            self.socketio.emit('new_entries_batch', {'entries': batch}, to=ENTRIES_TOPIC)
+    
+    def _today_stats(self, user_id):
+        """Today's minutes and entry count for a user, in one aggregate query"""
+        from app.models.entry import Entry
+        from datetime import date
+        
+        today_minutes, today_calls = Entry.get_day_totals(user_id, date.today())
+        
+        return {
+            'today_minutes': today_minutes,
+            'today_calls': today_calls,
+            'last_update': _timestamp()
+        }
+    
+    def _register_user(self, user_id, info):
+        """Record a connected user in the local or shared registry"""
+        if self._redis:
+            pipe = self._redis.pipeline()
+            pipe.zadd(CONNECTED_USERS_KEY, {user_id: time.time()})
+            pipe.hset(CONNECTED_USERS_INFO_KEY, user_id, json.dumps(info))
+            pipe.execute()
+        else:
+            self.connected_users[user_id] = info
+    
+    def _unregister_user(self, user_id):
+        """Remove a connected user, returning whether it was registered"""
+        if self._redis:
+            pipe = self._redis.pipeline()
+            pipe.zrem(CONNECTED_USERS_KEY, user_id)
+            pipe.hdel(CONNECTED_USERS_INFO_KEY, user_id)
+            return bool(pipe.execute()[0])
+        return self.connected_users.pop(user_id, None) is not None
+    
+    def _drop_stale_users(self):
+        """Drop shared registrations older than CONNECTED_USER_TTL, left by a crashed process"""
+        cutoff = time.time() - CONNECTED_USER_TTL
+        stale = self._redis.zrangebyscore(CONNECTED_USERS_KEY, '-inf', cutoff)
+        if stale:
+            pipe = self._redis.pipeline()
+            pipe.zremrangebyscore(CONNECTED_USERS_KEY, '-inf', cutoff)
+            pipe.hdel(CONNECTED_USERS_INFO_KEY, *stale)
+            pipe.execute()
+    
     def get_connected_users_count(self):
         """Get number of connected users"""
+        if self._redis:
+            self._drop_stale_users()
+            return self._redis.zcard(CONNECTED_USERS_KEY)
         return len(self.connected_users)
     
     def get_connected_users_info(self):
         """Get detailed info about connected users"""
+        if self._redis:
+            self._drop_stale_users()
+            user_ids = self._redis.zrange(CONNECTED_USERS_KEY, 0, -1)
+            if not user_ids:
+                return {}
+            infos = self._redis.hmget(CONNECTED_USERS_INFO_KEY, user_ids)
+            return {user_id.decode(): json.loads(info) for user_id, info in zip(user_ids, infos) if info}
         return self.connected_users.copy()
 
 # Global real-time sync instance
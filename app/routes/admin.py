@@ -6,8 +6,12 @@ from app.models.user import User
 from app.models.entry import Entry
 from app.models.courtier import Courtier
 from app.forms import CourtierForm
+from app.utils.cache import ttl_cached, clear_cache
+from app.utils.json_codec import json_response
+from app.utils.export_jobs import EXPORT_PERIODS, generate_export, start_export, get_export_job
 from datetime import date, datetime, timedelta
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select, literal, union_all, update
+from sqlalchemy.orm import joinedload
 import os
 import subprocess
 import platform
@@ -40,41 +44,59 @@ def admin_required(f):
 @login_required
 @admin_required
 def index():
-    # Get overview stats
-    total_users = User.query.filter_by(is_active=True).count()
-    total_entries = Entry.query.count()
-    today_entries = Entry.query.filter(Entry.date == date.today()).count()
-    
     # Get recent entries
-    recent_entries = Entry.query.order_by(desc(Entry.created_at)).limit(10).all()
+    recent_entries = Entry.query.options(joinedload(Entry.courtier), joinedload(Entry.user)).order_by(desc(Entry.created_at)).limit(10).all()
+    
+    return render_template('admin/index.html',
+                         recent_entries=recent_entries,
+                         **_overview_stats(date.today()))
+
+@ttl_cached(30)
+def _overview_stats(today):
+    """Aggregates for the admin overview, shared across admin tabs"""
+    # Get overview stats
+    total_users = db.session.query(func.count(User.id)).filter(User.is_active.is_(True)).scalar()
+    total_entries = db.session.query(func.count(Entry.id)).scalar()
+    today_entries = db.session.query(func.count(Entry.id)).filter(Entry.date == today).scalar()
     
-    # Get top users this month
-    current_month = date.today().strftime('%Y%m')
-    top_users = db.session.query(
-        User.full_name,
-        func.sum(Entry.minutes).label('total_minutes'),
-        func.count(Entry.id).label('total_entries')
-    ).join(Entry).filter(
+    # Top users and top clients this month, both ranked from one scan of the month
+    current_month = today.strftime('%Y%m')
+    monthly = select(Entry.user_id, Entry.client_name, Entry.minutes).where(
         Entry.period == current_month
-    ).group_by(User.id).order_by(desc('total_minutes')).limit(5).all()
+    ).cte('monthly')
     
-    # Get top clients this month
-    top_clients = db.session.query(
-        Entry.client_name,
-        func.sum(Entry.minutes).label('total_minutes'),
-        func.count(Entry.id).label('total_entries')
-    ).filter(
-        Entry.period == current_month,
-        Entry.client_name.isnot(None)
-    ).group_by(Entry.client_name).order_by(desc('total_minutes')).limit(5).all()
+    top_users_query = select(
+        literal('user').label('kind'),
+        User.full_name.label('name'),
+        func.sum(monthly.c.minutes).label('total_minutes'),
+        func.count().label('total_entries')
+    ).join(User, User.id == monthly.c.user_id).group_by(
+        User.id, User.full_name
+    ).order_by(desc('total_minutes')).limit(5).subquery()
     
-    return render_template('admin/index.html',
-                         total_users=total_users,
-                         total_entries=total_entries,
-                         today_entries=today_entries,
-                         recent_entries=recent_entries,
-                         top_users=top_users,
-                         top_clients=top_clients)
+    top_clients_query = select(
+        literal('client').label('kind'),
+        monthly.c.client_name.label('name'),
+        func.sum(monthly.c.minutes).label('total_minutes'),
+        func.count().label('total_entries')
+    ).where(monthly.c.client_name.isnot(None)).group_by(
+        monthly.c.client_name
+    ).order_by(desc('total_minutes')).limit(5).subquery()
+    
+    # A UNION ALL keeps no branch's ORDER BY, rank both lists again outside it
+    rows = db.session.execute(union_all(
+        select(top_users_query), select(top_clients_query)
+    ).order_by('kind', desc('total_minutes'))).all()
+    top_users = [(name, minutes, count) for kind, name, minutes, count in rows if kind == 'user']
+    top_clients = [(name, minutes, count) for kind, name, minutes, count in rows if kind == 'client']
+    
+    return {
+        'total_users': total_users,
+        'total_entries': total_entries,
+        'today_entries': today_entries,
+        'top_users': top_users,
+        'top_clients': top_clients
+    }
 
 @admin_bp.route('/users')
 @login_required
@@ -83,7 +105,7 @@ def users():
     users = User.query.all()
     return render_template('admin/users.html', users=users)
 
-@admin_bp.route('/users/<int:user_id>/toggle-status')
+@admin_bp.route('/users/<int:user_id>/toggle-status', methods=['POST'])
 @login_required
 @admin_required
 def toggle_user_status(user_id):
@@ -95,6 +117,13 @@ def toggle_user_status(user_id):
     flash(f'L\'utilisateur {user.full_name} a été {status}', 'success')
     return redirect(url_for('admin.users'))
 
+@admin_bp.route('/users/toggle', methods=['POST'])
+@login_required
+@admin_required
+def toggle_users_status():
+    """Activate or deactivate several users in one statement"""
+    return _set_active_status(User)
+
 @admin_bp.route('/courtiers')
 @login_required
 @admin_required
@@ -109,7 +138,7 @@ def add_courtier():
     # Redirect to dashboard add_courtier
     return redirect(url_for('dashboard.add_courtier'), code=307)
 
-@admin_bp.route('/courtiers/<int:courtier_id>/toggle-status')
+@admin_bp.route('/courtiers/<int:courtier_id>/toggle-status', methods=['POST'])
 @login_required
 @admin_required
 def toggle_courtier_status(courtier_id):
@@ -121,33 +150,72 @@ def toggle_courtier_status(courtier_id):
     flash(f'Courtier {courtier.name} a été {status}', 'success')
     return redirect(url_for('dashboard.courtiers'))
 
+@admin_bp.route('/courtiers/toggle', methods=['POST'])
+@login_required
+@admin_required
+def toggle_courtiers_status():
+    """Activate or deactivate several courtiers in one statement"""
+    return _set_active_status(Courtier)
+
+def _set_active_status(model):
+    """Apply a JSON {ids: [...], active: bool} request as a single UPDATE"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    ids = data.get('ids')
+    active = data.get('active')
+    if not ids or 'active' not in data:
+        return jsonify({'error': 'Missing required field: ids or active'}), 400
+    # bool is an int subclass, true/false must not pass for ids 1/0
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'error': 'ids must be a list of integers'}), 400
+    # Strings such as "false" would otherwise be truthy
+    if not isinstance(active, bool):
+        return jsonify({'error': 'active must be a boolean'}), 400
+    
+    result = db.session.execute(
+        update(model).where(model.id.in_(ids)).values(is_active=active)
+    )
+    db.session.commit()
+    # Bulk UPDATEs skip the mapper events that normally invalidate cached lists
+    clear_cache()
+    
+    return jsonify({'success': True, 'updated': result.rowcount})
+
 @admin_bp.route('/reports')
 @login_required
 @admin_required
 def reports():
+    return render_template('admin/reports.html', **_report_stats(date.today()))
+
+@ttl_cached(30)
+def _report_stats(today):
+    """Month and year totals for the reports page"""
     # Calculate current month stats
-    current_month = date.today().strftime('%Y%m')
-    current_month_entries = Entry.query.filter(Entry.period == current_month).count()
-    current_month_minutes = db.session.query(func.sum(Entry.minutes)).filter(Entry.period == current_month).scalar() or 0
+    current_month = today.strftime('%Y%m')
+    current_month_entries, current_month_minutes = db.session.query(
+        func.count(Entry.id),
+        func.coalesce(func.sum(Entry.minutes), 0)
+    ).filter(Entry.period == current_month).one()
     
     # Calculate current year stats
-    current_year = date.today().year
+    current_year = today.year
     start_of_year = date(current_year, 1, 1)
     end_of_year = date(current_year, 12, 31)
-    current_year_entries = Entry.query.filter(
-        Entry.date >= start_of_year,
-        Entry.date <= end_of_year
-    ).count()
-    current_year_minutes = db.session.query(func.sum(Entry.minutes)).filter(
+    current_year_entries, current_year_minutes = db.session.query(
+        func.count(Entry.id),
+        func.coalesce(func.sum(Entry.minutes), 0)
+    ).filter(
         Entry.date >= start_of_year,
         Entry.date <= end_of_year
-    ).scalar() or 0
+    ).one()
     
-    return render_template('admin/reports.html',
-                         current_month_entries=current_month_entries,
-                         current_month_minutes=current_month_minutes,
-                         current_year_entries=current_year_entries,
-                         current_year_minutes=current_year_minutes)
+    return {
+        'current_month_entries': current_month_entries,
+        'current_month_minutes': current_month_minutes,
+        'current_year_entries': current_year_entries,
+        'current_year_minutes': current_year_minutes
+    }
 
 @admin_bp.route('/export/<period>')
 @login_required
@@ -158,20 +226,12 @@ def export_report(period):
         flash('Export functionality not available. Please install pandas and openpyxl.', 'error')
         return redirect(url_for('admin.reports'))
     
+    if period not in EXPORT_PERIODS:
+        flash('Invalid export period', 'error')
+        return redirect(url_for('admin.reports'))
+    
     try:
-        exporter = ExcelExporter()
-        
-        if period == 'daily':
-            filename = exporter.export_daily_report(date.today())
-        elif period == 'monthly':
-            current_month = date.today().strftime('%Y%m')
-            filename = exporter.export_monthly_report(current_month)
-        elif period == 'yearly':
-            current_year = date.today().year
-            filename = exporter.export_yearly_report(current_year)
-        else:
-            flash('Invalid export period', 'error')
-            return redirect(url_for('admin.reports'))
+        filename = generate_export(period)
         
         # Get absolute path
         abs_path = os.path.abspath(filename)
@@ -197,6 +257,50 @@ def export_report(period):
         flash(f'Error generating report: {str(e)}', 'error')
         return redirect(url_for('admin.reports'))
 
+@admin_bp.route('/export/start/<period>', methods=['POST'])
+@login_required
+@admin_required
+def start_export_job(period):
+    """Start generating a report in the background and return its job id"""
+    if not EXPORT_AVAILABLE:
+        return jsonify({'error': 'Export functionality not available. Please install pandas and openpyxl.'}), 503
+    if period not in EXPORT_PERIODS:
+        return jsonify({'error': 'Invalid export period'}), 400
+    
+    from flask import current_app
+    from app import socketio
+    
+    job_id = start_export(current_app._get_current_object(), socketio, period, current_user.id)
+    return jsonify({'job_id': job_id}), 202
+
+@admin_bp.route('/export/status/<job_id>')
+@login_required
+@admin_required
+def export_job_status(job_id):
+    """Poll a background export"""
+    job = get_export_job(job_id)
+    if not job:
+        # Expired, or started by another worker process
+        return jsonify({'error': 'Unknown export job'}), 404
+    
+    return jsonify({
+        'status': job['status'],
+        'filename': os.path.basename(job['filename']) if job['filename'] else None,
+        'error': job['error']
+    })
+
+@admin_bp.route('/export/download/<job_id>')
+@login_required
+@admin_required
+def download_export(job_id):
+    """Download the file produced by a finished export"""
+    job = get_export_job(job_id)
+    if not job or job['status'] != 'done':
+        flash('Export not ready', 'error')
+        return redirect(url_for('admin.reports'))
+    
+    return send_file(os.path.abspath(job['filename']), as_attachment=True)
+
 @admin_bp.route('/backup')
 @login_required
 @admin_required
@@ -235,20 +339,12 @@ def open_export(period):
         flash('Export functionality not available. Please install pandas and openpyxl.', 'error')
         return redirect(url_for('admin.reports'))
     
+    if period not in EXPORT_PERIODS:
+        flash('Invalid export period', 'error')
+        return redirect(url_for('admin.reports'))
+    
     try:
-        exporter = ExcelExporter()
-        
-        if period == 'daily':
-            filename = exporter.export_daily_report(date.today())
-        elif period == 'monthly':
-            current_month = date.today().strftime('%Y%m')
-            filename = exporter.export_monthly_report(current_month)
-        elif period == 'yearly':
-            current_year = date.today().year
-            filename = exporter.export_yearly_report(current_year)
-        else:
-            flash('Invalid export period', 'error')
-            return redirect(url_for('admin.reports'))
+        filename = generate_export(period)
         
         # Get absolute path
         abs_path = os.path.abspath(filename)
@@ -278,16 +374,23 @@ def open_export(period):
 @admin_required
 def api_live_stats():
     """API endpoint for live admin statistics"""
-    active_users = User.query.filter_by(is_active=True).count()
-    today_entries = Entry.query.filter(Entry.date == date.today()).count()
-    
-    # Get entries from last hour
+    stats = _live_stats(date.today())
+    return json_response(dict(stats, timestamp=datetime.utcnow().isoformat()))
+
+@ttl_cached(15)
+def _live_stats(today):
+    """Counters polled by every open admin dashboard"""
     last_hour = datetime.utcnow() - timedelta(hours=1)
-    recent_activity = Entry.query.filter(Entry.created_at >= last_hour).count()
     
-    return jsonify({
+    # One round-trip, each count answered from an index (date, created_at)
+    active_users, today_entries, recent_activity = db.session.query(
+        select(func.count(User.id)).where(User.is_active.is_(True)).scalar_subquery(),
+        select(func.count(Entry.id)).where(Entry.date == today).scalar_subquery(),
+        select(func.count(Entry.id)).where(Entry.created_at >= last_hour).scalar_subquery()
+    ).one()
+    
+    return {
         'active_users': active_users,
         'today_entries': today_entries,
-        'recent_activity': recent_activity,
-        'timestamp': datetime.utcnow().isoformat()
-    })
\ No newline at end of file
+        'recent_activity': recent_activity
+    }
\ No newline at end of file
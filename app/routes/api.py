@@ -1,12 +1,24 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.models.entry import Entry
-from app.models.courtier import Courtier
-from datetime import date, datetime
+from app.models.courtier import get_active_courtiers
+from datetime import date, datetime, time
+import json
+from functools import lru_cache
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, lazyload
+from app.utils.cache import clear_cache
+from app.utils.json_codec import ndjson_line
 
 api_bp = Blueprint('api', __name__)
 
+ENTRY_FIELDS = ('courtier_id', 'minutes', 'type_dacte', 'acte_de_gestion', 'dossier', 'client_name', 'description')
+ENTRY_REQUIRED_FIELDS = ('courtier_id', 'minutes', 'type_dacte')
+TYPE_DACTE_VALUES = frozenset(Entry.__table__.c.type_dacte.type.enums)
+DEFAULT_TYPE_DACTE = Entry.__table__.c.type_dacte.default.arg  # For offline entries sent without one
+
 @api_bp.route('/entries', methods=['GET'])
 @login_required
 def get_entries():
@@ -14,8 +26,8 @@ def get_entries():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     
-    # Base query
-    query = Entry.query
+    # Base query, loading names in the same SELECT for to_dict()
+    query = Entry.query.options(joinedload(Entry.courtier), joinedload(Entry.user))
     
     # Apply user filter (non-admins can only see their own entries)
     if not current_user.is_admin():
@@ -30,9 +42,9 @@ def get_entries():
     end_date = request.args.get('end_date')
     
     if start_date:
-        query = query.filter(Entry.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
+        query = query.filter(Entry.date >= _parse_date(start_date))
     if end_date:
-        query = query.filter(Entry.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+        query = query.filter(Entry.date <= _parse_date(end_date))
     
     # Apply other filters
     courtier_id = request.args.get('courtier_id', type=int)
@@ -50,53 +62,96 @@ def get_entries():
     # Order by date descending
     query = query.order_by(Entry.created_at.desc())
     
-    # Paginate
-    entries = query.paginate(page=page, per_page=per_page, error_out=False)
+    page = max(page, 1)
+    per_page = max(per_page, 1)
+    
+    # Planner estimate by default, the exact COUNT(*) for callers that ask for it
+    total, total_is_estimate = _count_entries(query, exact=bool(request.args.get('include_total', type=int)))
+    pages = -(-total // per_page)
+    
+    if request.args.get('format') == 'ndjson':
+        return _stream_entries(query, page, per_page, total, pages, total_is_estimate)
+    
+    # Paginate, fetching one extra row to know whether a next page exists
+    items = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(items) > per_page
     
     return jsonify({
-        'entries': [entry.to_dict() for entry in entries.items],
-        'total': entries.total,
-        'pages': entries.pages,
+        'entries': [entry.to_dict() for entry in items[:per_page]],
+        'has_next': has_next,
+        'total': total,
+        'pages': pages,
+        'total_is_estimate': total_is_estimate,
         'current_page': page,
         'per_page': per_page
     })
 
+def _count_entries(query, exact=False):
+    """Count the rows a filtered entries query matches, as (count, is_estimate)"""
+    count_query = query.order_by(None).options(lazyload('*'))
+    if exact or db.engine.dialect.name != 'postgresql':
+        return count_query.count(), False
+    
+    # The planner's row estimate costs no scan, unlike COUNT(*) over a large history
+    compiled = count_query.statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows']), True
+
+def _stream_entries(query, page, per_page, total, pages, total_is_estimate):
+    """Stream one page of entries as NDJSON, with the paging metadata in headers"""
+    next_page = query.options(lazyload('*')).offset(page * per_page).limit(1)
+    headers = {
+        'X-Has-Next': str(db.session.query(next_page.exists()).scalar()).lower(),
+        'X-Current-Page': str(page),
+        'X-Per-Page': str(per_page),
+        'X-Total-Count': str(total),
+        'X-Pages': str(pages),
+        'X-Total-Is-Estimate': str(total_is_estimate).lower()
+    }
+    
+    page_query = query.limit(per_page).offset((page - 1) * per_page)
+    
+    def generate():
+        for entry in page_query.yield_per(100):
+            yield ndjson_line(entry.to_dict())
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=headers)
+
 @api_bp.route('/entries', methods=['POST'])
 @login_required
 def create_entry():
     """Create a new entry via API"""
-    data = request.get_json()
-    
-    # Validate required fields
-    required_fields = ['courtier_id', 'minutes', 'type_dacte']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Missing required field: {field}'}), 400
+    # Validate the whole payload in one pass
+    try:
+        values = _entry_payload(request.get_json(), required=ENTRY_REQUIRED_FIELDS)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
         entry = Entry(
             user_id=current_user.id,
-            courtier_id=data['courtier_id'],
-            minutes=data['minutes'],
-            type_dacte=data['type_dacte'],
-            acte_de_gestion=data.get('acte_de_gestion'),
-            dossier=data.get('dossier'),
-            client_name=data.get('client_name'),
-            description=data.get('description')
+            courtier_id=values['courtier_id'],
+            minutes=values['minutes'],
+            type_dacte=values['type_dacte'],
+            acte_de_gestion=values.get('acte_de_gestion'),
+            dossier=values.get('dossier'),
+            client_name=values.get('client_name'),
+            description=values.get('description'),
+            entry_date=values.get('date'),
+            entry_time=values.get('time')
         )
         
-        # Handle custom date/time if provided
-        if 'date' in data:
-            entry.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-        if 'time' in data:
-            entry.time = datetime.strptime(data['time'], '%H:%M').time()
-        
         db.session.add(entry)
+        db.session.flush()
+        # Serialize before commit expires the instance, saving a refresh SELECT
+        entry_data = entry.to_dict()
         db.session.commit()
         
         return jsonify({
             'message': 'Entry created successfully',
-            'entry': entry.to_dict()
+            'entry': entry_data
         }), 201
         
     except Exception as e:
@@ -113,29 +168,27 @@ def update_entry(entry_id):
     if not current_user.is_admin() and entry.user_id != current_user.id:
         return jsonify({'error': 'Access denied'}), 403
     
-    data = request.get_json()
+    try:
+        values = _entry_payload(request.get_json())
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
-        # Update allowed fields
-        allowed_fields = ['courtier_id', 'minutes', 'type_dacte', 'acte_de_gestion', 'dossier', 'client_name', 'description']
-        for field in allowed_fields:
-            if field in data:
-                setattr(entry, field, data[field])
-        
-        # Handle date/time updates
-        if 'date' in data:
-            entry.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
-            entry.period = entry.date.strftime('%Y%m')
-        
-        if 'time' in data:
-            entry.time = datetime.strptime(data['time'], '%H:%M').time()
+        # Update the fields present in the payload
+        for field, value in values.items():
+            setattr(entry, field, value)
         
         entry.updated_at = datetime.utcnow()
+        db.session.flush()
+        # Changed foreign keys leave the loaded courtier/user stale, reload them
+        # (from the identity map when already known) before serializing
+        db.session.expire(entry, ['courtier', 'user'])
+        entry_data = entry.to_dict()
         db.session.commit()
         
         return jsonify({
             'message': 'Entry updated successfully',
-            'entry': entry.to_dict()
+            'entry': entry_data
         })
         
     except Exception as e:
@@ -166,9 +219,8 @@ def delete_entry(entry_id):
 @login_required
 def get_courtiers():
     """Get list of courtiers"""
-    courtiers = Courtier.query.filter_by(is_active=True).all()
     return jsonify({
-        'courtiers': [courtier.to_dict() for courtier in courtiers]
+        'courtiers': get_active_courtiers()
     })
 
 @api_bp.route('/stats/dashboard', methods=['GET'])
@@ -179,13 +231,7 @@ def get_dashboard_stats():
     
     # Today's stats
     today = date.today()
-    today_entries = Entry.query.filter(
-        Entry.user_id == user_id,
-        Entry.date == today
-    ).all()
-    
-    today_minutes = sum(entry.minutes for entry in today_entries)
-    today_calls = len(today_entries)
+    today_minutes, today_calls = Entry.get_day_totals(user_id, today)
     
     # Weekly chart data
     from datetime import timedelta
@@ -197,10 +243,8 @@ def get_dashboard_stats():
     )
     
     # Fill missing dates with 0
-    chart_data = {}
-    for i in range(7):
-        chart_date = (week_ago + timedelta(days=i)).isoformat()
-        chart_data[chart_date] = daily_totals.get(chart_date, 0)
+    chart_data = dict.fromkeys(_week_dates(week_ago), 0)
+    chart_data.update(daily_totals)
     
     return jsonify({
         'today_minutes': today_minutes,
@@ -215,42 +259,99 @@ def sync_offline_entries():
     data = request.get_json()
     entries_data = data.get('entries', [])
     
-    synced_entries = []
+    # Validate everything up front so the batch can go out in one transaction
+    pending = []
     errors = []
-    
     for entry_data in entries_data:
         try:
-            entry = Entry(
-                user_id=current_user.id,
-                courtier_id=entry_data['courtier_id'],
-                minutes=entry_data['minutes'],
-                type_dacte=entry_data.get('type_dacte', 'Appel téléphonique'),
-                acte_de_gestion=entry_data.get('acte_de_gestion'),
-                dossier=entry_data.get('dossier'),
-                client_name=entry_data.get('client_name'),
-                description=entry_data.get('description')
-            )
-            
-            # Handle custom date/time
-            if 'date' in entry_data:
-                entry.date = datetime.strptime(entry_data['date'], '%Y-%m-%d').date()
-            if 'time' in entry_data:
-                entry.time = datetime.strptime(entry_data['time'], '%H:%M').time()
-            
-            db.session.add(entry)
-            db.session.commit()
-            synced_entries.append(entry.to_dict())
-            
-        except Exception as e:
-            db.session.rollback()
+            pending.append((entry_data, _offline_entry_values(entry_data)))
+        except (TypeError, ValueError) as e:
             errors.append({
                 'entry': entry_data,
                 'error': str(e)
             })
     
+    entries_insert = insert(Entry.__table__).returning(Entry.__table__.c.id)
+    synced_ids = []
+    if pending:
+        try:
+            synced_ids = db.session.scalars(entries_insert, [values for _, values in pending]).all()
+            db.session.commit()
+        except SQLAlchemyError:
+            # One bad row rejects the whole batch, retry each row under a
+            # savepoint to report it, still committing once
+            db.session.rollback()
+            synced_ids = []
+            for entry_data, values in pending:
+                try:
+                    with db.session.begin_nested():
+                        synced_ids.append(db.session.scalars(entries_insert, values).one())
+                except SQLAlchemyError as e:
+                    errors.append({
+                        'entry': entry_data,
+                        'error': str(e)
+                    })
+            db.session.commit()
+    
+    synced_entries = []
+    if synced_ids:
+        # Core inserts skip the Entry mapper events that invalidate this
+        clear_cache()
+        synced_entries = Entry.bulk_dict(synced_ids)
+    
     return jsonify({
         'synced': len(synced_entries),
         'errors': len(errors),
         'synced_entries': synced_entries,
         'error_details': errors
-    })
\ No newline at end of file
+    })
+
+def _offline_entry_values(entry_data):
+    """Column values for an entry queued by the client while offline"""
+    values = _entry_payload({'type_dacte': DEFAULT_TYPE_DACTE, **entry_data}, required=('courtier_id', 'minutes'))
+    
+    now = datetime.now()
+    return {
+        'user_id': current_user.id,
+        'acte_de_gestion': None,
+        'dossier': None,
+        'client_name': None,
+        'description': None,
+        'date': now.date(),
+        'time': now.time(),
+        **values
+    }
+
+def _entry_payload(data, required=()):
+    """Validate an entry JSON body, returning the attributes it sets"""
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    for field in required:
+        if field not in data:
+            raise ValueError(f'Missing required field: {field}')
+    
+    values = {field: data[field] for field in ENTRY_FIELDS if field in data}
+    for field in ('courtier_id', 'minutes'):
+        if field in values:
+            values[field] = int(values[field])
+    if 'type_dacte' in values and values['type_dacte'] not in TYPE_DACTE_VALUES:
+        raise ValueError(f"Invalid type_dacte: {values['type_dacte']}")
+    if 'date' in data:
+        values['date'] = _parse_date(data['date'])
+    if 'time' in data:
+        values['time'] = _parse_time(data['time'])
+    return values
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD string"""
+    return date.fromisoformat(value)
+
+def _parse_time(value):
+    """Parse an HH:MM string"""
+    return time.fromisoformat(value)
+
+@lru_cache(maxsize=1)
+def _week_dates(start):
+    """ISO dates of the seven days from start, computed once per day"""
+    from datetime import timedelta
+    return tuple((start + timedelta(days=i)).isoformat() for i in range(7))
@@ -39,13 +39,8 @@ def register():
     
     form = UserRegistrationForm()
     if form.validate_on_submit():
-        # Check if username or email already exists
-        existing_user = User.query.filter(
-            (User.username == form.username.data) | 
-            (User.email == form.email.data)
-        ).first()
-        
-        if existing_user:
+        # Check if username or email already exists, one unique-index lookup each
+        if _user_exists(username=form.username.data) or _user_exists(email=form.email.data):
             flash('Username or email already exists', 'error')
         else:
             user = User(
@@ -87,11 +82,7 @@ def edit_profile():
     if form.validate_on_submit():
         # Check if email is being changed and if it's already taken by another user
         if form.email.data != current_user.email:
-            existing_user = User.query.filter(
-                User.email == form.email.data,
-                User.id != current_user.id
-            ).first()
-            if existing_user:
+            if _user_exists(email=form.email.data):
                 flash('Cette adresse email est déjà utilisée par un autre utilisateur.', 'error')
                 return render_template('auth/edit_profile.html', form=form)
         
@@ -136,4 +127,8 @@ def change_password():
             db.session.rollback()
             flash('Erreur lors du changement de mot de passe.', 'error')
     
-    return render_template('auth/change_password.html', form=form)
\ No newline at end of file
+    return render_template('auth/change_password.html', form=form)
+
+def _user_exists(**criteria):
+    """EXISTS check on a user column, stopping at the first match"""
+    return db.session.query(User.query.filter_by(**criteria).exists()).scalar()
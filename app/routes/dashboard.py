@@ -3,9 +3,11 @@ from flask_login import login_required, current_user
 from app import db
 from app.models.user import User
 from app.models.entry import Entry
-from app.models.courtier import Courtier
+from app.models.courtier import Courtier, get_active_courtier_choices
 from app.forms import EntryForm, CourtierForm
+from app.utils.cache import ttl_cached
 from datetime import date, datetime, timedelta
+from sqlalchemy.orm import joinedload
 
 # Try to import SocketIO
 try:
@@ -23,14 +25,7 @@ dashboard_bp = Blueprint('dashboard', __name__)
 def index():
     # Get user stats for today
     today = date.today()
-    today_entries = Entry.query.filter(
-        Entry.user_id == current_user.id,
-        Entry.date == today
-    ).all()
-    
-    # Calculate stats
-    today_minutes = sum(entry.minutes for entry in today_entries)
-    today_calls = len(today_entries)
+    today_minutes, today_calls = Entry.get_day_totals(current_user.id, today)
     
     # Get last 7 days for chart - current user
     week_ago = today - timedelta(days=7)
@@ -40,30 +35,30 @@ def index():
         end_date=today
     )
     
-    # Get all users' activity for multi-user chart
-    all_users = User.query.filter_by(is_active=True).all()
-    multi_user_data = {}
+    # Get all users' activity for multi-user chart, reading only the columns it shows
+    active_users = db.session.query(User.id, User.full_name).filter(User.is_active.is_(True)).all()
     
-    for user in all_users:
-        user_daily_totals = Entry.get_daily_totals(
-            user_id=user.id,
-            start_date=week_ago,
-            end_date=today
-        )
-        multi_user_data[user.id] = {
-            'name': user.full_name,
-            'data': user_daily_totals,
-            'is_current': user.id == current_user.id
+    # One grouped query for every active user's week instead of one per user
+    users_daily_totals = Entry.get_daily_totals_multi_user(
+        week_ago, today, user_ids=[user_id for user_id, _ in active_users]
+    )
+    multi_user_data = {
+        user_id: {
+            'name': full_name,
+            'data': users_daily_totals.get(user_id, {}),
+            'is_current': user_id == current_user.id
         }
+        for user_id, full_name in active_users
+    }
     
     # Get user's overall stats
     user_stats = current_user.get_stats()
     
     # Get courtiers for the form
-    courtiers = Courtier.query.filter_by(is_active=True).all()
+    courtiers = get_active_courtier_choices()
     
     form = EntryForm()
-    form.courtier_id.choices = [(c.id, c.name) for c in courtiers]
+    form.courtier_id.choices = courtiers
     
     return render_template('dashboard/index.html', 
                          form=form,
@@ -78,8 +73,7 @@ def index():
 @login_required
 def add_entry():
     form = EntryForm()
-    courtiers = Courtier.query.filter_by(is_active=True).all()
-    form.courtier_id.choices = [(c.id, c.name) for c in courtiers]
+    form.courtier_id.choices = get_active_courtier_choices()
     
     if form.validate_on_submit():
         entry = Entry(
@@ -96,12 +90,15 @@ def add_entry():
         )
         
         db.session.add(entry)
+        db.session.flush()
+        # Serialize before commit expires the instance, saving a refresh SELECT
+        entry_data = entry.to_dict() if SOCKETIO_AVAILABLE and socketio else None
         db.session.commit()
         
         # Emit real-time update if SocketIO is available
-        if SOCKETIO_AVAILABLE and socketio:
+        if entry_data:
             socketio.emit('entry_added', {
-                'entry': entry.to_dict(),
+                'entry': entry_data,
                 'user_id': current_user.id
             })
         
@@ -117,18 +114,18 @@ def add_entry():
 def api_stats():
     """API endpoint for real-time stats"""
     today = date.today()
-    today_entries = Entry.query.filter(
+    today_minutes, today_calls = Entry.get_day_totals(current_user.id, today)
+    
+    # Only the latest row is serialized, with its names joined in
+    last_entry = Entry.query.options(joinedload(Entry.courtier), joinedload(Entry.user)).filter(
         Entry.user_id == current_user.id,
         Entry.date == today
-    ).all()
-    
-    today_minutes = sum(entry.minutes for entry in today_entries)
-    today_calls = len(today_entries)
+    ).order_by(Entry.id.desc()).first()
     
     return jsonify({
         'today_minutes': today_minutes,
         'today_calls': today_calls,
-        'last_entry': today_entries[-1].to_dict() if today_entries else None
+        'last_entry': last_entry.to_dict() if last_entry else None
     })
 
 @dashboard_bp.route('/api/chart-data')
@@ -139,13 +136,16 @@ def api_chart_data():
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
     
-    daily_totals = Entry.get_daily_totals(
-        user_id=current_user.id,
+    return jsonify(_chart_totals(current_user.id, start_date, end_date))
+
+@ttl_cached(60)
+def _chart_totals(user_id, start_date, end_date):
+    """Daily totals for the polled dashboard chart, shared across a user's tabs"""
+    return Entry.get_daily_totals(
+        user_id=user_id,
         start_date=start_date,
         end_date=end_date
     )
-    
-    return jsonify(daily_totals)
 
 @dashboard_bp.route('/courtiers')
 @login_required
@@ -210,10 +210,12 @@ def delete_courtier(courtier_id):
     """Delete a courtier"""
     courtier = Courtier.query.get_or_404(courtier_id)
     
-    # Check if courtier has any entries
-    entry_count = Entry.query.filter_by(courtier_id=courtier_id).count()
+    # Check if courtier has any entries, stopping at the first one
+    has_entries = db.session.query(Entry.query.filter(Entry.courtier_id == courtier_id).exists()).scalar()
     
-    if entry_count > 0:
+    if has_entries:
+        # Only count them for the message
+        entry_count = courtier.get_entries_count()
         flash(f'Impossible de supprimer {courtier.name}. Ce courtier a {entry_count} entrées associées.', 'error')
     else:
         courtier_name = courtier.name
@@ -15,7 +15,7 @@ class MinutesTrackerApp {
     
     initializeSocket() {
         if (typeof io !== 'undefined') {
-            this.socket = io();
+            this.socket = io({ transports: ['websocket'] });
             
             this.socket.on('connect', () => {
                 console.log('Connected to server');
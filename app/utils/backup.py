@@ -1,14 +1,291 @@
+import errno
+import gzip
+import hashlib
+import heapq
+import json
 import os
+import re
 import shutil
 import subprocess
 import sqlite3
+import tarfile
+import tempfile
+import threading
+import urllib.parse
+from queue import Queue
+from contextlib import closing
 from datetime import datetime, timedelta
 from flask import current_app
 from app import db
 
+COMPRESSED_SUFFIXES = ('.zst', '.gz')
+
+# backup_<type>_<YYYYmmdd_HHMMSS>.<ext>, where the type may itself contain underscores
+BACKUP_NAME_RE = re.compile(r'backup_(.+?)_(\d{8}_\d{6})\.')
+
+# Scheduled SQLite backups store only the pages changed since a weekly full base
+SQLITE_BASE_MANIFEST = 'sqlite_base.json'
+DIFF_BASE_RE = re.compile(r'\.from_(\d{8}_\d{6})\.dbdiff')
+
+# Backups are written under this suffix and renamed once complete, never listed
+PARTIAL_SUFFIX = '.partial'
+
+# 1 MiB chunks instead of copyfileobj's small default, fewer syscalls per backup
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def _parse_timestamp(ts):
+    """Parse a YYYYmmdd_HHMMSS backup timestamp, much cheaper than strptime"""
+    return datetime(int(ts[0:4]), int(ts[4:6]), int(ts[6:8]), int(ts[9:11]), int(ts[11:13]), int(ts[13:15]))
+
+def _compressor(level):
+    """Command compressing stdin to stdout and its file suffix, or None for in-process gzip"""
+    # Multithreaded zstd, then parallel gzip
+    if shutil.which('zstd'):
+        return ['zstd', '-T0', f'-{level}', '-q', '-c'], '.zst'
+    if shutil.which('pigz'):
+        return ['pigz', '-p', str(os.cpu_count() or 1), f'-{level}', '-c'], '.gz'
+    return None, '.gz'
+
+def _copy_prefetched(f_in, f_out):
+    """Copy in COPY_BUFFER_SIZE chunks, reading the next chunk while the current one is written"""
+    # zlib and file I/O release the GIL, so a reader thread keeps the disk or
+    # the dump pipe busy while the main thread compresses or decompresses
+    chunks = Queue(maxsize=4)
+    errors = []
+    
+    def read_ahead():
+        try:
+            for chunk in iter(lambda: f_in.read(COPY_BUFFER_SIZE), b''):
+                chunks.put(chunk)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunks.put(None)
+    
+    reader = threading.Thread(target=read_ahead, daemon=True)
+    reader.start()
+    try:
+        for chunk in iter(chunks.get, None):
+            f_out.write(chunk)
+    finally:
+        # Unblock and wait for the reader if the write side failed
+        while reader.is_alive():
+            if chunks.get() is None:
+                break
+        reader.join()
+    
+    if errors:
+        raise errors[0]
+
+def _compress(src, level):
+    """Compress src next to itself, removing the original, and return the new path"""
+    with open(src, 'rb', buffering=COPY_BUFFER_SIZE) as f_in:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f_in.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        partial, dst = _compress_stream(f_in, src, level)
+    
+    _publish(partial, dst)
+    os.remove(src)
+    return dst
+
+def _compress_stream(f_in, base, level):
+    """Compress a binary stream for base plus the compressor's suffix, returning the partial and final paths"""
+    cmd, suffix = _compressor(level)
+    dst = base + suffix
+    partial = dst + PARTIAL_SUFFIX
+    
+    with open(partial, 'wb', buffering=COPY_BUFFER_SIZE) as f_out:
+        if cmd:
+            result = subprocess.run(cmd, stdin=f_in, stdout=f_out, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                raise Exception(f"{cmd[0]} failed: {result.stderr.decode(errors='replace')}")
+        else:
+            with gzip.GzipFile(fileobj=f_out, mode='wb', compresslevel=level) as gz_out:
+                _copy_prefetched(f_in, gz_out)
+    
+    return partial, dst
+
+def _publish(partial, dst):
+    """Rename a finished backup into place once it is on disk, so no reader sees it half-written"""
+    with open(partial, 'r+b') as f:
+        os.fsync(f.fileno())
+    os.replace(partial, dst)
+    
+    # Make the rename itself durable; directories cannot be opened for fsync on Windows
+    if os.name == 'posix':
+        dir_fd = os.open(os.path.dirname(os.path.abspath(dst)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def _dump_compressed(cmd, base, level, env=None):
+    """Pipe a dump command's stdout straight into the compressor, without a plain copy on disk"""
+    with tempfile.TemporaryFile() as stderr:
+        dump = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, env=env, bufsize=COPY_BUFFER_SIZE)
+        try:
+            partial, dst = _compress_stream(dump.stdout, base, level)
+        except Exception:
+            dump.kill()
+            _remove_partial(base)
+            raise
+        finally:
+            dump.stdout.close()
+            returncode = dump.wait()
+        
+        if returncode != 0:
+            os.remove(partial)
+            stderr.seek(0)
+            raise Exception(f"{cmd[0]} failed: {stderr.read().decode(errors='replace')}")
+    
+    _publish(partial, dst)
+    return dst
+
+def _remove_partial(base):
+    """Remove what a failed backup left behind at base, plain or compressed"""
+    for path in (base, *(base + suffix + end for suffix in COMPRESSED_SUFFIXES for end in ('', PARTIAL_SUFFIX))):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _fast_copy(src, dst):
+    """Copy a file in the kernel, as a reflink on filesystems that support it"""
+    if not hasattr(os, 'copy_file_range'):
+        return shutil.copyfile(src, dst)
+    
+    with open(src, 'rb') as f_in, open(dst, 'wb') as f_out:
+        try:
+            while os.copy_file_range(f_in.fileno(), f_out.fileno(), 1 << 30):
+                pass
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+            # Unsupported across these filesystems, copy from where it stopped
+            f_in.seek(f_out.tell())
+            shutil.copyfileobj(f_in, f_out, COPY_BUFFER_SIZE)
+    return dst
+
+def _decompress(src):
+    """Decompress a .zst or .gz backup next to itself and return the new path"""
+    dst = src.rsplit('.', 1)[0]
+    if src.endswith('.zst'):
+        _run_compressor(['zstd', '-d', '-q', '-f', '-o', dst, src])
+    else:
+        with gzip.open(src, 'rb') as f_in:
+            with open(dst, 'wb', buffering=COPY_BUFFER_SIZE) as f_out:
+                _copy_prefetched(f_in, f_out)
+    return dst
+
+def _restore_from_dump(cmd, backup_file, env=None):
+    """Stream a plain, .gz or .zst SQL dump into a restore command's stdin, without a temp copy"""
+    if backup_file.endswith('.zst'):
+        decompress_cmd = ['zstd', '-d', '-q', '-c', backup_file]
+    elif backup_file.endswith('.gz') and shutil.which('gzip'):
+        decompress_cmd = ['gzip', '-d', '-c', backup_file]
+    else:
+        decompress_cmd = None
+    
+    with tempfile.TemporaryFile() as stderr:
+        if decompress_cmd:
+            source = subprocess.Popen(decompress_cmd, stdout=subprocess.PIPE, stderr=stderr, bufsize=COPY_BUFFER_SIZE)
+            restore = subprocess.Popen(cmd, stdin=source.stdout, stdout=subprocess.DEVNULL, stderr=stderr, env=env)
+            source.stdout.close()  # The restore owns the pipe now
+            # Reap both, the restore's own failure takes precedence
+            returncode = restore.wait()
+            source_returncode = source.wait()
+            returncode = returncode or source_returncode
+        elif backup_file.endswith('.gz'):
+            restore = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr, env=env)
+            try:
+                with gzip.open(backup_file, 'rb') as f_in:
+                    _copy_prefetched(f_in, restore.stdin)
+            except BrokenPipeError:
+                pass  # The restore exited early, its status and stderr tell why
+            finally:
+                restore.stdin.close()
+            returncode = restore.wait()
+        else:
+            with open(backup_file, 'rb') as f_in:
+                returncode = subprocess.run(cmd, stdin=f_in, stdout=subprocess.DEVNULL, stderr=stderr, env=env).returncode
+        
+        if returncode != 0:
+            stderr.seek(0)
+            raise Exception(f"{cmd[0]} restore failed: {stderr.read().decode(errors='replace')}")
+
+def _run_compressor(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"{cmd[0]} failed: {result.stderr}")
+
+def _dump_directory(cmd, dump_dir, env=None):
+    """Run a dump tool writing one file per table into dump_dir, then tar the directory"""
+    archive = f'{dump_dir}.tar'
+    partial = archive + PARTIAL_SUFFIX
+    
+    try:
+        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"{cmd[0]} failed: {result.stderr}")
+        
+        # The tool compresses each file itself, the tar is not compressed again
+        with tarfile.open(partial, 'w') as tar:
+            tar.add(dump_dir, arcname=os.path.basename(dump_dir))
+        _publish(partial, archive)
+        return archive
+    except Exception:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        shutil.rmtree(dump_dir, ignore_errors=True)
+
+def _extract_dump(archive, extract_dir):
+    """Unpack a _dump_directory archive and return the dump directory inside it"""
+    with tarfile.open(archive) as tar:
+        tar.extractall(extract_dir, filter='data')
+    return os.path.join(extract_dir, os.path.basename(archive)[:-len('.tar')])
+
+def _page_hash(page):
+    return hashlib.blake2b(page, digest_size=8).hexdigest()
+
+def _read_pages(f, page_size):
+    return iter(lambda: f.read(page_size), b'')
+
+def _write_page_diff(snapshot, diff_file, header, base_hashes):
+    """Write the snapshot pages that differ from the base, each prefixed by its page number"""
+    page_size = header['page_size']
+    with open(snapshot, 'rb', buffering=COPY_BUFFER_SIZE) as f_in, \
+            open(diff_file, 'wb', buffering=COPY_BUFFER_SIZE) as f_out:
+        f_out.write(json.dumps(header).encode() + b'\n')
+        for index, page in enumerate(_read_pages(f_in, page_size)):
+            if index >= len(base_hashes) or _page_hash(page) != base_hashes[index]:
+                f_out.write(index.to_bytes(4, 'big'))
+                f_out.write(page)
+
+def _apply_page_diff(f_diff, target, header):
+    """Overwrite target's pages with those stored in a page diff"""
+    page_size = header['page_size']
+    with open(target, 'r+b') as f_out:
+        while True:
+            index = f_diff.read(4)
+            if not index:
+                break
+            f_out.seek(int.from_bytes(index, 'big') * page_size)
+            f_out.write(f_diff.read(page_size))
+        f_out.truncate(header['page_count'] * page_size)
+
 class BackupManager:
     def __init__(self):
         self.backup_path = current_app.config.get('BACKUP_PATH', './backups')
+        # Backups are bound by disk bandwidth, the fastest level costs little in size
+        self.compress_level = current_app.config.get('BACKUP_COMPRESS_LEVEL', 1)
+        # Above 1, PostgreSQL is dumped table-parallel in directory format
+        self.pg_dump_jobs = min(os.cpu_count() or 1, current_app.config.get('PG_DUMP_JOBS', 1))
+        self.sqlite_full_backup_days = current_app.config.get('SQLITE_FULL_BACKUP_DAYS', 7)
+        # Parsed once, every backup and restore of this manager reuses it
+        self.database_url = current_app.config.get('SQLALCHEMY_DATABASE_URI')
+        self.parsed_url = urllib.parse.urlparse(self.database_url) if self.database_url else None
         os.makedirs(self.backup_path, exist_ok=True)
     
     def create_backup(self, backup_type='manual'):
@@ -16,10 +293,11 @@ class BackupManager:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         backup_filename = f'backup_{backup_type}_{timestamp}'
         
-        database_url = current_app.config.get('SQLALCHEMY_DATABASE_URI')
+        database_url = self.database_url
         
         if database_url.startswith('sqlite:'):
-            return self._backup_sqlite(backup_filename, database_url)
+            # Scheduled runs may store a page diff, manual backups are always self-contained
+            return self._backup_sqlite(backup_filename, database_url, incremental=backup_type.startswith('auto'))
         elif database_url.startswith('postgresql:'):
             return self._backup_postgresql(backup_filename, database_url)
         elif database_url.startswith('mysql:'):
@@ -27,7 +305,7 @@ class BackupManager:
         else:
             raise ValueError(f"Unsupported database type: {database_url}")
     
-    def _backup_sqlite(self, backup_filename, database_url):
+    def _backup_sqlite(self, backup_filename, database_url, incremental=False):
         """Backup SQLite database"""
         # Extract database file path from URL
         if database_url.startswith('sqlite:///'):
@@ -40,54 +318,102 @@ class BackupManager:
             db_path = os.path.abspath(db_path)
             
         backup_file = os.path.join(self.backup_path, f'{backup_filename}.db')
-        compressed_file = f'{backup_file}.gz'
         
         try:
             # Check if source database exists
             if not os.path.exists(db_path):
                 raise FileNotFoundError(f"Database file not found: {db_path}")
             
-            # Close all database connections before backup
-            db.engine.dispose()
+            # Online Backup API: a consistent copy while the app keeps its connections
+            with closing(sqlite3.connect(db_path)) as source, closing(sqlite3.connect(backup_file)) as target:
+                source.backup(target)
+                page_size = target.execute('PRAGMA page_size').fetchone()[0]
             
-            # Use simple file copy for SQLite (works better on Windows)
-            shutil.copy2(db_path, backup_file)
+            if incremental:
+                return self._store_sqlite_increment(backup_file, backup_filename, page_size)
             
-            # Compress the backup
-            with open(backup_file, 'rb') as f_in:
-                import gzip
-                with gzip.open(compressed_file, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
+            # Compress the backup, removing the uncompressed file
+            compressed_file = _compress(backup_file, self.compress_level)
+            
+            return compressed_file
             
-            # Remove uncompressed file
+        except Exception:
+            _remove_partial(backup_file)
+            raise
+    
+    def _store_sqlite_increment(self, snapshot, backup_filename, page_size):
+        """Keep a snapshot as a page diff against the current base, or make it the new base"""
+        manifest_path = os.path.join(self.backup_path, SQLITE_BASE_MANIFEST)
+        timestamp = backup_filename[-15:]
+        
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        
+        base_is_current = (
+            manifest is not None
+            and manifest['page_size'] == page_size
+            and os.path.exists(os.path.join(self.backup_path, manifest['base']))
+            and _parse_timestamp(manifest['timestamp'])
+                > datetime.now() - timedelta(days=self.sqlite_full_backup_days)
+        )
+        
+        if base_is_current:
+            diff_file = os.path.join(self.backup_path, f"{backup_filename}.from_{manifest['timestamp']}.dbdiff")
+            header = {
+                'base': manifest['base'],
+                'page_size': page_size,
+                'page_count': os.path.getsize(snapshot) // page_size
+            }
             try:
-                os.remove(backup_file)
-            except:
-                pass  # Ignore if file can't be removed
+                _write_page_diff(snapshot, diff_file, header, manifest['hashes'])
+                return _compress(diff_file, self.compress_level)
+            except Exception:
+                # The diff and its half-compressed copy, the snapshot is the caller's
+                _remove_partial(diff_file)
+                raise
+            finally:
+                os.remove(snapshot)
+        
+        # Full backup, recorded with its page hashes as the base for the next runs
+        with open(snapshot, 'rb', buffering=COPY_BUFFER_SIZE) as f:
+            hashes = [_page_hash(page) for page in _read_pages(f, page_size)]
+        compressed_file = _compress(snapshot, self.compress_level)
+        
+        with open(manifest_path + PARTIAL_SUFFIX, 'w') as f:
+            json.dump({
+                'base': os.path.basename(compressed_file),
+                'timestamp': timestamp,
+                'page_size': page_size,
+                'hashes': hashes
+            }, f)
+        _publish(manifest_path + PARTIAL_SUFFIX, manifest_path)
+        return compressed_file
+    
+    def _rebuild_sqlite_diff(self, diff_file):
+        """Rebuild the full database a page diff was taken from, next to it"""
+        with open(diff_file, 'rb', buffering=COPY_BUFFER_SIZE) as f_diff:
+            header = json.loads(f_diff.readline())
+            base = os.path.join(self.backup_path, header['base'])
+            if not os.path.exists(base):
+                raise FileNotFoundError(f"Base backup not found: {header['base']}")
             
-            return compressed_file
+            rebuilt = f'{diff_file[:-len(".dbdiff")]}.db'
+            if base.endswith(COMPRESSED_SUFFIXES):
+                os.replace(_decompress(base), rebuilt)
+            else:
+                _fast_copy(base, rebuilt)
             
-        except Exception as e:
-            # Clean up on error
-            if os.path.exists(backup_file):
-                try:
-                    os.remove(backup_file)
-                except:
-                    pass
-            if os.path.exists(compressed_file):
-                try:
-                    os.remove(compressed_file)
-                except:
-                    pass
-            raise e
+            _apply_page_diff(f_diff, rebuilt, header)
+        return rebuilt
     
     def _backup_postgresql(self, backup_filename, database_url):
         """Backup PostgreSQL database using pg_dump"""
-        backup_file = os.path.join(self.backup_path, f'{backup_filename}.sql')
+        backup_base = os.path.join(self.backup_path, f'{backup_filename}.sql')
         
         # Parse database URL
-        import urllib.parse
-        url = urllib.parse.urlparse(database_url)
+        url = self.parsed_url
         
         # Build pg_dump command
         env = os.environ.copy()
@@ -100,43 +426,44 @@ class BackupManager:
             '-p', str(url.port or 5432),
             '-U', url.username or 'postgres',
             '-d', url.path[1:],  # Remove leading slash
-            '-f', backup_file,
             '--verbose',
             '--clean',
             '--no-owner',
             '--no-privileges'
         ]
         
-        try:
+        if self.pg_dump_jobs > 1:
+            return self._backup_postgresql_parallel(cmd, backup_filename, env)
+        
+        # Without zstd or pigz, pg_dump gzips its own output rather than piping it through Python
+        if _compressor(self.compress_level)[0] is None:
+            backup_file = f'{backup_base}.gz'
+            cmd += ['-Z', str(self.compress_level), '-f', backup_file + PARTIAL_SUFFIX]
             result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-            
             if result.returncode != 0:
+                _remove_partial(backup_base)
                 raise Exception(f"pg_dump failed: {result.stderr}")
-            
-            # Compress the backup
-            compressed_file = f'{backup_file}.gz'
-            with open(backup_file, 'rb') as f_in:
-                import gzip
-                with gzip.open(compressed_file, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            
-            # Remove uncompressed file
-            os.remove(backup_file)
-            
-            return compressed_file
-            
-        except Exception as e:
-            if os.path.exists(backup_file):
-                os.remove(backup_file)
-            raise e
+            _publish(backup_file + PARTIAL_SUFFIX, backup_file)
+            return backup_file
+        
+        # Dump straight into the compressor
+        return _dump_compressed(cmd, backup_base, self.compress_level, env=env)
+    
+    def _backup_postgresql_parallel(self, cmd, backup_filename, env):
+        """Dump tables concurrently in pg_dump's directory format"""
+        dump_dir = os.path.join(self.backup_path, f'{backup_filename}.pgdir')
+        cmd = cmd + ['-Fd', '-j', str(self.pg_dump_jobs), '-Z', str(self.compress_level), '-f', dump_dir]
+        return _dump_directory(cmd, dump_dir, env=env)
     
     def _backup_mysql(self, backup_filename, database_url):
         """Backup MySQL database using mysqldump"""
-        backup_file = os.path.join(self.backup_path, f'{backup_filename}.sql')
+        backup_base = os.path.join(self.backup_path, f'{backup_filename}.sql')
         
         # Parse database URL
-        import urllib.parse
-        url = urllib.parse.urlparse(database_url)
+        url = self.parsed_url
+        
+        if shutil.which('mydumper'):
+            return self._backup_mysql_mydumper(url, backup_filename)
         
         # Build mysqldump command
         cmd = [
@@ -146,8 +473,7 @@ class BackupManager:
             f'--user={url.username}',
             '--single-transaction',
             '--routines',
-            '--triggers',
-            '--result-file=' + backup_file
+            '--triggers'
         ]
         
         if url.password:
@@ -155,44 +481,41 @@ class BackupManager:
         
         cmd.append(url.path[1:])  # Database name, remove leading slash
         
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                raise Exception(f"mysqldump failed: {result.stderr}")
-            
-            # Compress the backup
-            compressed_file = f'{backup_file}.gz'
-            with open(backup_file, 'rb') as f_in:
-                import gzip
-                with gzip.open(compressed_file, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            
-            # Remove uncompressed file
-            os.remove(backup_file)
-            
-            return compressed_file
-            
-        except Exception as e:
-            if os.path.exists(backup_file):
-                os.remove(backup_file)
-            raise e
+        # Dump straight into the compressor
+        return _dump_compressed(cmd, backup_base, self.compress_level)
+    
+    def _backup_mysql_mydumper(self, url, backup_filename):
+        """Dump tables and row chunks concurrently with mydumper"""
+        dump_dir = os.path.join(self.backup_path, f'{backup_filename}.mydumper')
+        
+        cmd = [
+            'mydumper',
+            '--host', url.hostname or 'localhost',
+            '--port', str(url.port or 3306),
+            '--user', url.username,
+            '--outputdir', dump_dir,
+            '--threads', str(os.cpu_count() or 1),
+            '--compress',
+            '--rows', '50000',
+            '--trx-consistency-only',
+            '--database', url.path[1:]
+        ]
+        if url.password:
+            cmd += ['--password', url.password]
+        
+        return _dump_directory(cmd, dump_dir)
     
     def restore_backup(self, backup_file):
         """Restore database from backup"""
         if not os.path.exists(backup_file):
             raise FileNotFoundError(f"Backup file not found: {backup_file}")
         
-        database_url = current_app.config.get('SQLALCHEMY_DATABASE_URI')
+        database_url = self.database_url
         
-        # Decompress if needed
-        if backup_file.endswith('.gz'):
-            import gzip
-            temp_file = backup_file[:-3]  # Remove .gz extension
-            with gzip.open(backup_file, 'rb') as f_in:
-                with open(temp_file, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            backup_file = temp_file
+        # SQLite restores a database file, dumps are streamed to the server still compressed
+        temp_file = None
+        if database_url.startswith('sqlite:') and backup_file.endswith(COMPRESSED_SUFFIXES):
+            temp_file = backup_file = _decompress(backup_file)
         
         try:
             if database_url.startswith('sqlite:'):
@@ -205,8 +528,8 @@ class BackupManager:
                 raise ValueError(f"Unsupported database type: {database_url}")
         finally:
             # Clean up temp file if we decompressed
-            if backup_file.endswith('.sql') and os.path.exists(backup_file):
-                os.remove(backup_file)
+            if temp_file and os.path.exists(temp_file):
+                os.remove(temp_file)
     
     def _restore_sqlite(self, backup_file, database_url):
         """Restore SQLite database"""
@@ -220,6 +543,14 @@ class BackupManager:
         if not os.path.isabs(db_path):
             db_path = os.path.abspath(db_path)
         
+        if backup_file.endswith('.dbdiff'):
+            rebuilt = self._rebuild_sqlite_diff(backup_file)
+            try:
+                self._restore_sqlite(rebuilt, database_url)
+            finally:
+                os.remove(rebuilt)
+            return
+        
         # Close all connections
         db.engine.dispose()
         
@@ -228,38 +559,56 @@ class BackupManager:
         
         # Replace database file
         if os.path.exists(db_path):
-            shutil.copy2(db_path, f'{db_path}.bak')  # Create backup of current
+            _fast_copy(db_path, f'{db_path}.bak')  # Create backup of current
         
-        shutil.copy2(backup_file, db_path)
+        _fast_copy(backup_file, db_path)
     
     def _restore_postgresql(self, backup_file, database_url):
         """Restore PostgreSQL database"""
-        import urllib.parse
-        url = urllib.parse.urlparse(database_url)
+        url = self.parsed_url
         
         # Build psql command
         env = os.environ.copy()
         if url.password:
             env['PGPASSWORD'] = url.password
         
-        cmd = [
-            'psql',
+        connection = [
             '-h', url.hostname or 'localhost',
             '-p', str(url.port or 5432),
             '-U', url.username or 'postgres',
-            '-d', url.path[1:],
-            '-f', backup_file
+            '-d', url.path[1:]
         ]
         
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if backup_file.endswith('.pgdir.tar'):
+            self._restore_postgresql_parallel(backup_file, connection, env)
+            return
+        
+        _restore_from_dump(['psql'] + connection, backup_file, env=env)
+    
+    def _restore_postgresql_parallel(self, backup_file, connection, env):
+        """Restore a directory-format dump with parallel pg_restore workers"""
+        with tempfile.TemporaryDirectory(dir=self.backup_path) as extract_dir:
+            dump_dir = _extract_dump(backup_file, extract_dir)
+            
+            cmd = ['pg_restore'] + connection + [
+                '-j', str(max(self.pg_dump_jobs, 1)),
+                '--clean',
+                '--no-owner',
+                '--no-privileges',
+                dump_dir
+            ]
+            result = subprocess.run(cmd, env=env, capture_output=True, text=True)
         
         if result.returncode != 0:
-            raise Exception(f"psql restore failed: {result.stderr}")
+            raise Exception(f"pg_restore failed: {result.stderr}")
     
     def _restore_mysql(self, backup_file, database_url):
         """Restore MySQL database"""
-        import urllib.parse
-        url = urllib.parse.urlparse(database_url)
+        url = self.parsed_url
+        
+        if backup_file.endswith('.mydumper.tar'):
+            self._restore_mysql_myloader(backup_file, url)
+            return
         
         # Build mysql command
         cmd = [
@@ -274,46 +623,67 @@ class BackupManager:
         
         cmd.append(url.path[1:])  # Database name
         
-        with open(backup_file, 'r') as f:
-            result = subprocess.run(cmd, stdin=f, capture_output=True, text=True)
+        _restore_from_dump(cmd, backup_file)
+    
+    def _restore_mysql_myloader(self, backup_file, url):
+        """Restore a mydumper archive with parallel myloader threads"""
+        with tempfile.TemporaryDirectory(dir=self.backup_path) as extract_dir:
+            cmd = [
+                'myloader',
+                '--host', url.hostname or 'localhost',
+                '--port', str(url.port or 3306),
+                '--user', url.username,
+                '--directory', _extract_dump(backup_file, extract_dir),
+                '--threads', str(os.cpu_count() or 1),
+                '--queries-per-transaction', '50000',
+                '--overwrite-tables',
+                '--database', url.path[1:]
+            ]
+            if url.password:
+                cmd += ['--password', url.password]
+            
+            result = subprocess.run(cmd, capture_output=True, text=True)
         
         if result.returncode != 0:
-            raise Exception(f"mysql restore failed: {result.stderr}")
+            raise Exception(f"myloader restore failed: {result.stderr}")
     
     def list_backups(self):
         """List all available backups"""
-        backups = []
+        backups = list(self._scan_backups())
         
+        # Sort by timestamp, newest first
+        backups.sort(key=lambda x: x['timestamp'], reverse=True)
+        return backups
+    
+    def _scan_backups(self):
+        """Yield the backups found in backup_path, in directory order"""
         if not os.path.exists(self.backup_path):
-            return backups
-        
-        for filename in os.listdir(self.backup_path):
-            if filename.startswith('backup_'):
-                filepath = os.path.join(self.backup_path, filename)
-                stat = os.stat(filepath)
+            return
+        
+        # scandir hands back stat data with each entry, no separate stat() per file
+        with os.scandir(self.backup_path) as entries:
+            for entry in entries:
+                if not entry.name.startswith('backup_') or entry.name.endswith(PARTIAL_SUFFIX):
+                    continue
+                stat = entry.stat()
                 
                 # Parse backup info from filename
-                parts = filename.replace('.gz', '').replace('.sql', '').replace('.db', '').split('_')
-                backup_type = parts[1] if len(parts) > 1 else 'unknown'
-                timestamp_str = parts[2] if len(parts) > 2 else ''
+                match = BACKUP_NAME_RE.match(entry.name)
+                backup_type = match.group(1) if match else 'unknown'
                 
                 try:
-                    timestamp = datetime.strptime(timestamp_str, '%Y%m%d_%H%M%S')
-                except ValueError:
+                    timestamp = _parse_timestamp(match.group(2))
+                except (AttributeError, ValueError):
                     timestamp = datetime.fromtimestamp(stat.st_mtime)
                 
-                backups.append({
-                    'filename': filename,
-                    'filepath': filepath,
+                yield {
+                    'filename': entry.name,
+                    'filepath': entry.path,
                     'type': backup_type,
                     'timestamp': timestamp,
                     'size': stat.st_size,
                     'size_mb': round(stat.st_size / (1024 * 1024), 2)
-                })
-        
-        # Sort by timestamp, newest first
-        backups.sort(key=lambda x: x['timestamp'], reverse=True)
-        return backups
+                }
     
     def delete_backup(self, filename):
         """Delete a specific backup file"""
@@ -325,24 +695,43 @@ class BackupManager:
         os.remove(filepath)
     
     def cleanup_old_backups(self, keep_days=30, keep_count=10):
-        """Clean up old backup files"""
-        backups = self.list_backups()
+        """Clean up old backup files (compressed at BACKUP_COMPRESS_LEVEL, fast rather than smallest)"""
+        backups = list(self._scan_backups())
         
         # Keep at least keep_count backups
         if len(backups) <= keep_count:
             return []
         
+        # Only the newest keep_count need ordering, not the whole directory
+        newest = {backup['filename'] for backup in heapq.nlargest(keep_count, backups, key=lambda x: x['timestamp'])}
+        
         # Delete backups older than keep_days
         cutoff_date = datetime.now() - timedelta(days=keep_days)
         deleted_files = []
         
-        for backup in backups[keep_count:]:  # Skip the newest keep_count backups
-            if backup['timestamp'] < cutoff_date:
-                try:
-                    self.delete_backup(backup['filename'])
-                    deleted_files.append(backup['filename'])
-                except Exception as e:
-                    print(f"Failed to delete backup {backup['filename']}: {e}")
+        expired = [backup for backup in backups
+                   if backup['filename'] not in newest and backup['timestamp'] < cutoff_date]
+        
+        # Keep the SQLite bases that remaining page diffs, or the next ones, rebuild from
+        expired_names = {backup['filename'] for backup in expired}
+        needed_bases = {match.group(1) for match in (
+            DIFF_BASE_RE.search(backup['filename']) for backup in backups if backup['filename'] not in expired_names
+        ) if match}
+        manifest_path = os.path.join(self.backup_path, SQLITE_BASE_MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                needed_bases.add(json.load(f)['timestamp'])
+        
+        for backup in expired:
+            name = backup['filename']
+            match = BACKUP_NAME_RE.match(name)
+            if match and not DIFF_BASE_RE.search(name) and match.group(2) in needed_bases:
+                continue
+            try:
+                os.unlink(backup['filepath'])
+                deleted_files.append(name)
+            except Exception as e:
+                print(f"Failed to delete backup {name}: {e}")
         
         return deleted_files
     
@@ -355,12 +744,15 @@ class BackupManager:
         
         # Daily backup at 2 AM
         scheduler.add_job(
-            func=lambda: self.create_backup('auto_daily'),
+            func=self.create_backup,
+            args=['auto_daily'],
             trigger="cron",
             hour=2,
             minute=0,
             id='daily_backup',
-            replace_existing=True
+            replace_existing=True,
+            misfire_grace_time=3600,
+            coalesce=True
         )
         
         # Weekly cleanup on Sundays at 3 AM
@@ -371,10 +763,12 @@ class BackupManager:
             hour=3,
             minute=0,
             id='backup_cleanup',
-            replace_existing=True
+            replace_existing=True,
+            misfire_grace_time=3600,
+            coalesce=True
         )
         
         scheduler.start()
         
         # Shut down the scheduler when exiting the app
-        atexit.register(lambda: scheduler.shutdown())
\ No newline at end of file
+        atexit.register(scheduler.shutdown)
\ No newline at end of file
@@ -1,9 +1,10 @@
 """
 Automated backup scheduler for WikiDesk server
 """
-import schedule
-import time
-import threading
+import atexit
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 import shutil
@@ -22,6 +23,10 @@ class BackupScheduler:
         # Shared network backup path (if configured)
         self.network_backup_dir = None
         self.setup_network_backup()
+        
+        # Network copies run in the background, a slow share never holds up the scheduler
+        self._network_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='backup-network')
+        atexit.register(self._network_executor.shutdown, wait=True)
     
     def setup_network_backup(self):
         """Setup network backup location"""
@@ -42,25 +47,28 @@ class BackupScheduler:
             except Exception as e:
                 logger.warning(f"Cannot access {path}: {str(e)}")
     
-    def create_backup(self):
+    @property
+    def uses_sqlite(self):
+        """Whether the app runs on a local SQLite database rather than the PostgreSQL server"""
+        return self.app.config.get('SQLALCHEMY_DATABASE_URI', '').startswith('sqlite:')
+    
+    def create_backup(self, backup_type='auto_daily'):
         """Create a database backup"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
             # Create database backup
-            backup_file = db_manager.create_backup(self.backup_dir)
+            if self.uses_sqlite:
+                backup_file = self._create_sqlite_backup(backup_type)
+            else:
+                backup_file = db_manager.create_backup(self.backup_dir)
             
             if backup_file:
                 logger.info(f"Database backup created: {backup_file}")
                 
                 # Copy to network location if available
-                if self.network_backup_dir:
-                    try:
-                        network_backup = self.network_backup_dir / Path(backup_file).name
-                        shutil.copy2(backup_file, network_backup)
-                        logger.info(f"Backup copied to network: {network_backup}")
-                    except Exception as e:
-                        logger.error(f"Failed to copy backup to network: {str(e)}")
+                if self.network_backup_dir and self.uses_sqlite:
+                    self._network_executor.submit(self._copy_sqlite_to_network, backup_file)
+                elif self.network_backup_dir:
+                    self._network_executor.submit(self._copy_to_network, backup_file, Path(backup_file).name)
                 
                 # Clean old backups
                 self.cleanup_old_backups()
@@ -74,74 +82,124 @@ class BackupScheduler:
             logger.error(f"Backup error: {str(e)}")
             return None
     
+    def _create_sqlite_backup(self, backup_type):
+        """Back up SQLite through BackupManager, as a page diff against the weekly base"""
+        from app.utils.backup import BackupManager
+        
+        with self.app.app_context():
+            manager = BackupManager()
+            backup_file = manager.create_backup(backup_type)
+            # Its cleanup keeps the bases that remaining diffs rebuild from
+            manager.cleanup_old_backups(keep_days=NetworkConfig.BACKUP_RETENTION_DAYS)
+        return backup_file
+    
+    def _copy_to_network(self, backup_file, name):
+        """Copy a backup to the network location, logging rather than raising"""
+        try:
+            network_backup = self.network_backup_dir / name
+            with open(backup_file, 'rb') as f_in, open(network_backup, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+            shutil.copystat(backup_file, network_backup)
+            logger.info(f"Backup copied to network: {network_backup}")
+        except Exception as e:
+            logger.error(f"Failed to copy backup to network: {str(e)}")
+    
+    def _copy_sqlite_to_network(self, backup_file):
+        """Copy a SQLite backup with the base and manifest it restores from, then prune the share"""
+        from app.utils.backup import BackupManager, SQLITE_BASE_MANIFEST
+        
+        local_dir = Path(backup_file).parent
+        manifest = local_dir / SQLITE_BASE_MANIFEST
+        
+        # Page diffs only restore next to their base, which may predate the share
+        if manifest.exists():
+            with open(manifest) as f:
+                base = json.load(f)['base']
+            if not (self.network_backup_dir / base).exists():
+                self._copy_to_network(local_dir / base, base)
+        self._copy_to_network(backup_file, Path(backup_file).name)
+        if manifest.exists():
+            self._copy_to_network(manifest, SQLITE_BASE_MANIFEST)
+        
+        # Same retention as the local folder, keeping the bases the remaining diffs need
+        try:
+            with self.app.app_context():
+                manager = BackupManager()
+                manager.backup_path = str(self.network_backup_dir)
+                manager.cleanup_old_backups(keep_days=NetworkConfig.BACKUP_RETENTION_DAYS)
+        except Exception as e:
+            logger.error(f"Network backup cleanup error: {str(e)}")
+    
     def cleanup_old_backups(self):
         """Remove backups older than retention period"""
         try:
-            cutoff_date = datetime.now() - timedelta(days=NetworkConfig.BACKUP_RETENTION_DAYS)
+            cutoff = (datetime.now() - timedelta(days=NetworkConfig.BACKUP_RETENTION_DAYS)).timestamp()
             
             # Clean local backups
-            for backup_file in self.backup_dir.glob("wikiDesk_backup_*.sql"):
-                if backup_file.stat().st_mtime < cutoff_date.timestamp():
-                    backup_file.unlink()
-                    logger.info(f"Removed old backup: {backup_file}")
+            self._prune(self.backup_dir, cutoff, "old backup")
             
             # Clean network backups
             if self.network_backup_dir:
-                for backup_file in self.network_backup_dir.glob("wikiDesk_backup_*.sql"):
-                    if backup_file.stat().st_mtime < cutoff_date.timestamp():
-                        backup_file.unlink()
-                        logger.info(f"Removed old network backup: {backup_file}")
+                self._prune(self.network_backup_dir, cutoff, "old network backup")
                         
         except Exception as e:
             logger.error(f"Backup cleanup error: {str(e)}")
     
+    def _prune(self, root, cutoff, label):
+        """Delete the backups in root last modified before cutoff"""
+        # scandir hands back stat data with each entry, no fnmatch or separate stat() per file
+        with os.scandir(root) as entries:
+            for entry in entries:
+                name = entry.name
+                if not (name.startswith("wikiDesk_backup_") and name.endswith(".sql")):
+                    continue
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    logger.info(f"Removed {label}: {entry.path}")
+    
     def schedule_backups(self):
         """Schedule automatic backups"""
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from apscheduler.triggers.cron import CronTrigger
+        
+        # One timer thread sleeping until the next fire time, no polling
+        scheduler = BackgroundScheduler()
+        
         # Daily backup at 2:00 AM
-        schedule.every().day.at("02:00").do(self.create_backup)
+        scheduler.add_job(self.create_backup, CronTrigger(hour=2, minute=0),
+                          id='daily_backup', replace_existing=True, misfire_grace_time=3600, coalesce=True)
         
         # Weekly backup on Sunday at 1:00 AM
-        schedule.every().sunday.at("01:00").do(self.create_weekly_backup)
+        scheduler.add_job(self.create_weekly_backup, CronTrigger(day_of_week='sun', hour=1, minute=0),
+                          id='weekly_backup', replace_existing=True, misfire_grace_time=3600, coalesce=True)
+        
+        scheduler.start()
+        atexit.register(scheduler.shutdown, wait=False)
         
         logger.info("Backup schedule configured:")
         logger.info("- Daily backup: 2:00 AM")
         logger.info("- Weekly backup: Sunday 1:00 AM")
+        return scheduler
     
     def create_weekly_backup(self):
         """Create a special weekly backup"""
         try:
-            backup_file = self.create_backup()
-            if backup_file and self.network_backup_dir:
+            backup_file = self.create_backup('auto_weekly')
+            if backup_file and self.network_backup_dir and not self.uses_sqlite:
                 # Create a special weekly backup copy
-                weekly_backup = self.network_backup_dir / f"weekly_{Path(backup_file).name}"
-                shutil.copy2(backup_file, weekly_backup)
-                logger.info(f"Weekly backup created: {weekly_backup}")
+                self._network_executor.submit(self._copy_to_network, backup_file, f"weekly_{Path(backup_file).name}")
         except Exception as e:
             logger.error(f"Weekly backup error: {str(e)}")
     
-    def run_scheduler(self):
-        """Run the backup scheduler"""
-        logger.info("Starting backup scheduler...")
-        
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
-            except Exception as e:
-                logger.error(f"Scheduler error: {str(e)}")
-                time.sleep(60)
-
 def start_backup_scheduler(app):
-    """Start the backup scheduler in a separate thread"""
+    """Start the backup scheduler and take an initial backup"""
     scheduler = BackupScheduler(app)
     scheduler.schedule_backups()
     
     # Create initial backup
     logger.info("Creating initial backup...")
     scheduler.create_backup()
-    
-    # Start scheduler
-    scheduler.run_scheduler()
+    return scheduler
 
 # Manual backup function for immediate use
 def create_manual_backup(app):
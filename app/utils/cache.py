@@ -0,0 +1,61 @@
+"""
+Short-lived in-process cache for dashboard aggregates
+"""
+import threading
+import time
+from functools import wraps
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_entries = {}
+_lock = threading.Lock()
+
+# Models whose committed changes invalidate the cache, and the session flag marking them
+_watched_models = ()
+_DIRTY_KEY = 'cache_dirty'
+
+def ttl_cached(timeout):
+    """Memoize a function on its arguments for `timeout` seconds"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            
+            with _lock:
+                cached = _entries.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+            
+            value = func(*args, **kwargs)
+            with _lock:
+                _entries[key] = (now + timeout, value)
+            return value
+        return wrapper
+    return decorator
+
+def clear_cache():
+    """Drop every cached value, e.g. after entries change"""
+    with _lock:
+        _entries.clear()
+
+def invalidate_on_commit(*models):
+    """Clear the cache after every commit that flushed changes to one of these models"""
+    global _watched_models
+    _watched_models += models
+
+def clear_cache_on_commit(session):
+    """Clear the cache once session commits, for writes that skip the flush"""
+    session.info[_DIRTY_KEY] = True
+
+# Clearing at flush time would let another request cache the old rows before COMMIT
+@event.listens_for(Session, 'after_flush')
+def _mark_flushed_changes(session, flush_context):
+    if any(isinstance(obj, _watched_models) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info[_DIRTY_KEY] = True
+
+@event.listens_for(Session, 'after_commit')
+def _clear_committed_changes(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        clear_cache()
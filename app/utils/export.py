@@ -1,15 +1,248 @@
+import hashlib
 import os
+import tempfile
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime, timedelta
-from sqlalchemy import func
+from flask import current_app
+from sqlalchemy import Date, and_, bindparam, distinct, func, select
 from app import db
 from app.models.entry import Entry
 from app.models.user import User
 from app.models.courtier import Courtier
 
+# Columns of the By User sheet, in the enum's declaration order
+TYPE_DACTE_VALUES = Entry.__table__.c.type_dacte.type.enums
+
+# xlsxwriter writes workbooks faster and leaner than openpyxl's cell objects
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_ENGINE = 'xlsxwriter'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
+
+def _excel_writer(filename):
+    # Not constant_memory: to_excel writes column by column, which that mode cannot take
+    # Dates go out as real Excel dates, so they sort and filter as dates
+    return pd.ExcelWriter(filename, engine=EXCEL_ENGINE, date_format='YYYY-MM-DD')
+
+REPORT_QUERY_WORKERS = 4
+TOP_CLIENTS_LIMIT = 50
+
+def _set_column_width(worksheet, index, width):
+    """Set the width of a zero-based column on either engine's worksheet"""
+    if EXCEL_ENGINE == 'xlsxwriter':
+        worksheet.set_column(index, index, width)
+    else:
+        from openpyxl.utils import get_column_letter
+        worksheet.column_dimensions[get_column_letter(index + 1)].width = width
+
+def _add_worksheet(writer, name, rows):
+    """Write a small sheet of plain rows straight to the workbook, without a DataFrame"""
+    if EXCEL_ENGINE == 'xlsxwriter':
+        worksheet = writer.book.add_worksheet(name)
+        for index, row in enumerate(rows):
+            worksheet.write_row(index, 0, row)
+    else:
+        worksheet = writer.book.create_sheet(name)
+        for row in rows:
+            worksheet.append(row)
+    return worksheet
+
+# Every report covers entries with start <= date < end; the statements below are built
+# once against these bind parameters, so each one compiles once for all exports
+_IN_RANGE = and_(Entry.date >= bindparam('start', type_=Date), Entry.date < bindparam('end', type_=Date))
+
+_STAMP = select(func.max(Entry.updated_at), func.count(Entry.id)).where(_IN_RANGE)
+# Sheets show user and courtier names, which change without touching any entry
+_NAME_STAMPS = (
+    select(User.id, User.full_name).order_by(User.id),
+    select(Courtier.id, Courtier.name).order_by(Courtier.id)
+)
+
+_ENTRIES = select(
+    Entry.date, Entry.time, User.full_name.label('user'), Courtier.name.label('courtier'),
+    Entry.minutes, Entry.type_dacte, Entry.acte_de_gestion, Entry.dossier, Entry.client_name, Entry.description
+).join(User, User.id == Entry.user_id).join(Courtier, Courtier.id == Entry.courtier_id).where(_IN_RANGE).order_by(Entry.id)
+
+_SUMMARY_TOTALS = select(
+    func.count(Entry.id),
+    func.coalesce(func.sum(Entry.minutes), 0),
+    func.count(distinct(Entry.user_id)),
+    func.count(distinct(Entry.courtier_id)),
+    func.count(distinct(func.nullif(Entry.client_name, '')))
+).where(_IN_RANGE)
+
+_type_minutes = func.sum(Entry.minutes)
+_SUMMARY_TYPES = select(Entry.type_dacte, _type_minutes).where(_IN_RANGE).group_by(
+    Entry.type_dacte
+).order_by(_type_minutes.desc(), Entry.type_dacte)
+
+# One row per (user, type d'acte)
+_BY_USER = select(
+    User.id, User.full_name, Entry.type_dacte, func.count(Entry.id), func.sum(Entry.minutes)
+).join(Entry, Entry.user_id == User.id).where(_IN_RANGE).group_by(User.id, User.full_name, Entry.type_dacte)
+
+# One row per (courtier, user)
+_BY_COURTIER = select(
+    Courtier.id, Courtier.name, User.id, User.full_name, func.count(Entry.id), func.sum(Entry.minutes)
+).select_from(Entry).join(Courtier, Courtier.id == Entry.courtier_id).join(
+    User, User.id == Entry.user_id
+).where(_IN_RANGE).group_by(Courtier.id, Courtier.name, User.id, User.full_name)
+
+_BY_TYPE_DACTE = select(
+    Entry.type_dacte,
+    func.count(Entry.id),
+    func.sum(Entry.minutes),
+    func.count(distinct(Entry.user_id)),
+    func.count(distinct(Entry.courtier_id))
+).where(_IN_RANGE).group_by(Entry.type_dacte)
+
+_BY_DAY = select(Entry.date, func.count(Entry.id), func.sum(Entry.minutes)).where(
+    _IN_RANGE
+).group_by(Entry.date).order_by(Entry.date)
+
+_BY_PERIOD = select(Entry.period, func.count(Entry.id), func.sum(Entry.minutes)).where(
+    _IN_RANGE
+).group_by(Entry.period).order_by(Entry.period)
+
+# The busiest clients, ranked and cut by the database
+_client_minutes = func.sum(Entry.minutes)
+_TOP_CLIENTS = select(
+    Entry.client_name,
+    func.count(Entry.id),
+    _client_minutes,
+    func.count(distinct(Entry.user_id)),
+    func.count(distinct(Entry.courtier_id))
+).where(
+    _IN_RANGE,
+    Entry.client_name != ''  # Also false for NULL names
+).group_by(Entry.client_name).order_by(_client_minutes.desc(), Entry.client_name).limit(TOP_CLIENTS_LIMIT)
+
+def _report_stamp(bounds):
+    """Entry count and a key that changes whenever the report's entries do"""
+    last_update, count = db.session.execute(_STAMP, bounds).one()
+    digest = hashlib.blake2b(f'{last_update}:{count}'.encode(), digest_size=8)
+    # A renamed user or courtier must not keep serving a workbook with the old name
+    for stmt in _NAME_STAMPS:
+        for row in db.session.execute(stmt):
+            digest.update(repr(tuple(row)).encode())
+    return count, digest.hexdigest()
+
+def _is_current(filename, key):
+    """Whether filename was already built from entries with this stamp key"""
+    try:
+        with open(filename + '.key') as f:
+            return f.read() == key and os.path.exists(filename)
+    except FileNotFoundError:
+        return False
+
+def _fetch_report(bounds, key, *fetchers):
+    """Fetch a report's rows, with the stamp key to cache them under or None"""
+    rows = _fetch_all(bounds, *fetchers)
+    # The queries may each see a different snapshot; an unchanged stamp afterwards
+    # means they all saw the data the key describes, otherwise nothing is cached
+    if _report_stamp(bounds)[1] != key:
+        key = None
+    return key, rows
+
+@contextmanager
+def _report_writer(filename, key):
+    """Write a report next to its final name, then swap it in and record its stamp key"""
+    root, ext = os.path.splitext(filename)
+    # Unique per build, two jobs exporting the same period must not share it;
+    # pandas picks the format from the extension
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(filename) or '.', prefix=f'{os.path.basename(root)}.', suffix=f'.partial{ext}')
+    os.close(fd)
+    try:
+        with _excel_writer(partial) as writer:
+            yield writer
+        # The previous key describes the workbook about to be replaced
+        if os.path.exists(filename + '.key'):
+            os.remove(filename + '.key')
+        os.replace(partial, filename)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    
+    if key is not None:
+        _replace_text(filename + '.key', key)
+
+def _replace_text(filename, text):
+    """Write a small file through a unique temporary name, so readers never see it half-written"""
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(filename) or '.', prefix=f'{os.path.basename(filename)}.', suffix='.partial')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(partial, filename)
+    except BaseException:
+        os.remove(partial)
+        raise
+
+def _entries_frame(bounds):
+    """Load a report's detailed rows straight into a DataFrame, without building ORM objects"""
+    entries = pd.read_sql(_ENTRIES, db.session.connection(), params=bounds, parse_dates=['date'])
+    # Names and types repeat on every row; minutes fit comfortably in 32 bits
+    return entries.astype({'user': 'category', 'courtier': 'category', 'type_dacte': 'category', 'minutes': 'int32'})
+
+def _summary_rows(bounds):
+    """Report totals, then minutes per type d'acte largest share first"""
+    return db.session.execute(_SUMMARY_TOTALS, bounds).one(), db.session.execute(_SUMMARY_TYPES, bounds).all()
+
+def _user_rows(bounds):
+    return db.session.execute(_BY_USER, bounds).all()
+
+def _courtier_rows(bounds):
+    return db.session.execute(_BY_COURTIER, bounds).all()
+
+def _type_dacte_rows(bounds):
+    return db.session.execute(_BY_TYPE_DACTE, bounds).all()
+
+def _day_rows(bounds):
+    return db.session.execute(_BY_DAY, bounds).all()
+
+def _period_rows(bounds):
+    return db.session.execute(_BY_PERIOD, bounds).all()
+
+def _top_client_rows(bounds):
+    return db.session.execute(_TOP_CLIENTS, bounds).all()
+
+def _can_fetch_concurrently():
+    """Whether report queries can run on separate threads and connections"""
+    from app import SOCKETIO_ASYNC_MODE
+    
+    # Under eventlet the export already runs on a single tpool thread
+    if SOCKETIO_ASYNC_MODE == 'eventlet':
+        return False
+    # Every thread would open its own, empty, in-memory database
+    url = db.engine.url
+    return not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'))
+
+def _fetch_all(bounds, *fetchers):
+    """Run a report's independent queries, concurrently when the database allows it"""
+    if not _can_fetch_concurrently():
+        return [fetch(bounds) for fetch in fetchers]
+    
+    app = current_app._get_current_object()
+    
+    def run(fetch):
+        # Each app context gets its own scoped session, so its own pooled connection
+        with app.app_context():
+            return fetch(bounds)
+    
+    with ThreadPoolExecutor(max_workers=REPORT_QUERY_WORKERS) as pool:
+        return list(pool.map(run, fetchers))
+
+def _run_here(func, *args):
+    return func(*args)
+
 class ExcelExporter:
-    def __init__(self):
+    def __init__(self, offload=_run_here):
         self.export_dir = 'exports'
+        # Runs the workbook build, which only touches rows already fetched on this thread
+        self.offload = offload
         os.makedirs(self.export_dir, exist_ok=True)
     
     def export_daily_report(self, report_date=None):
@@ -18,119 +251,140 @@ class ExcelExporter:
             report_date = date.today()
         
         # Get entries for the date
-        entries = Entry.query.filter(Entry.date == report_date).all()
+        bounds = {'start': report_date, 'end': report_date + timedelta(days=1)}
+        count, key = _report_stamp(bounds)
         
-        if not entries:
+        if not count:
             raise ValueError(f"No entries found for {report_date}")
         
         # Create filename
         filename = os.path.join(self.export_dir, f'daily_report_{report_date.strftime("%Y%m%d")}.xlsx')
         
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        # Nothing changed since the last export of this day
+        if _is_current(filename, key):
+            return filename
+        
+        # Queries run up front, the workbook itself is written from one thread
+        key, (summary, entries, users, courtiers) = _fetch_report(
+            bounds, key, _summary_rows, _entries_frame, _user_rows, _courtier_rows
+        )
+        self.offload(self._write_daily_report, filename, key, report_date, summary, entries, users, courtiers)
+        return filename
+    
+    def _write_daily_report(self, filename, key, report_date, summary, entries, users, courtiers):
+        with _report_writer(filename, key) as writer:
             # Summary sheet
-            self._create_summary_sheet(entries, writer, f'Daily Report - {report_date}')
+            self._create_summary_sheet(summary, writer, f'Daily Report - {report_date}')
             
             # Detailed entries
             self._create_entries_sheet(entries, writer)
             
             # By user summary
-            self._create_user_summary_sheet(entries, writer)
+            self._create_user_summary_sheet(users, writer)
             
             # By courtier summary
-            self._create_courtier_summary_sheet(entries, writer)
-        
-        return filename
+            self._create_courtier_summary_sheet(courtiers, writer)
     
     def export_monthly_report(self, period):
         """Export monthly report for a specific period (YYYYMM)"""
-        entries = Entry.query.filter(Entry.period == period).all()
+        # A range on the indexed date column, like the daily and yearly reports
+        start_date = date(int(period[:4]), int(period[4:]), 1)
+        bounds = {'start': start_date, 'end': (start_date + timedelta(days=31)).replace(day=1)}
+        count, key = _report_stamp(bounds)
         
-        if not entries:
+        if not count:
             raise ValueError(f"No entries found for period {period}")
         
         # Create filename
         filename = os.path.join(self.export_dir, f'monthly_report_{period}.xlsx')
         
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        # Nothing changed since the last export of this month
+        if _is_current(filename, key):
+            return filename
+        
+        key, (summary, days, entries, users, courtiers, types) = _fetch_report(
+            bounds, key, _summary_rows, _day_rows, _entries_frame, _user_rows, _courtier_rows, _type_dacte_rows
+        )
+        self.offload(self._write_monthly_report, filename, key, period, summary, days, entries, users, courtiers, types)
+        return filename
+    
+    def _write_monthly_report(self, filename, key, period, summary, days, entries, users, courtiers, types):
+        with _report_writer(filename, key) as writer:
             # Summary sheet
-            self._create_summary_sheet(entries, writer, f'Monthly Report - {period}')
+            self._create_summary_sheet(summary, writer, f'Monthly Report - {period}')
             
             # Daily breakdown
-            self._create_daily_breakdown_sheet(entries, writer, period)
+            self._create_daily_breakdown_sheet(days, writer, period)
             
             # Detailed entries
             self._create_entries_sheet(entries, writer)
             
             # By user summary
-            self._create_user_summary_sheet(entries, writer)
+            self._create_user_summary_sheet(users, writer)
             
             # By courtier summary
-            self._create_courtier_summary_sheet(entries, writer)
+            self._create_courtier_summary_sheet(courtiers, writer)
             
             # By type d'acte summary
-            self._create_type_dacte_summary_sheet(entries, writer)
-        
-        return filename
+            self._create_type_dacte_summary_sheet(types, writer)
     
     def export_yearly_report(self, year):
         """Export yearly report for a specific year"""
-        start_date = date(year, 1, 1)
-        end_date = date(year, 12, 31)
         
-        entries = Entry.query.filter(
-            Entry.date >= start_date,
-            Entry.date <= end_date
-        ).all()
+        # No detailed sheet for a year, every sheet is aggregated by the database
+        bounds = {'start': date(year, 1, 1), 'end': date(year + 1, 1, 1)}
+        count, key = _report_stamp(bounds)
         
-        if not entries:
+        if not count:
             raise ValueError(f"No entries found for year {year}")
         
         # Create filename
         filename = os.path.join(self.export_dir, f'yearly_report_{year}.xlsx')
         
-        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+        # Nothing changed since the last export of this year
+        if _is_current(filename, key):
+            return filename
+        
+        key, (summary, periods, users, courtiers, types, clients) = _fetch_report(
+            bounds, key, _summary_rows, _period_rows, _user_rows, _courtier_rows, _type_dacte_rows, _top_client_rows
+        )
+        self.offload(self._write_yearly_report, filename, key, year, summary, periods, users, courtiers, types, clients)
+        return filename
+    
+    def _write_yearly_report(self, filename, key, year, summary, periods, users, courtiers, types, clients):
+        # One month-level aggregate feeds both the monthly and quarterly sheets
+        monthly = self._period_totals(periods)
+        with _report_writer(filename, key) as writer:
             # Summary sheet
-            self._create_summary_sheet(entries, writer, f'Yearly Report - {year}')
+            self._create_summary_sheet(summary, writer, f'Yearly Report - {year}')
             
             # Monthly breakdown
-            self._create_monthly_breakdown_sheet(entries, writer, year)
+            self._create_monthly_breakdown_sheet(monthly, writer, year)
             
             # Quarterly breakdown
-            self._create_quarterly_breakdown_sheet(entries, writer, year)
+            self._create_quarterly_breakdown_sheet(monthly, writer, year)
             
             # By user summary
-            self._create_user_summary_sheet(entries, writer)
+            self._create_user_summary_sheet(users, writer)
             
             # By courtier summary
-            self._create_courtier_summary_sheet(entries, writer)
+            self._create_courtier_summary_sheet(courtiers, writer)
             
             # By type d'acte summary
-            self._create_type_dacte_summary_sheet(entries, writer)
+            self._create_type_dacte_summary_sheet(types, writer)
             
             # Top clients
-            self._create_top_clients_sheet(entries, writer)
-        
-        return filename
+            self._create_top_clients_sheet(clients, writer)
     
-    def _create_summary_sheet(self, entries, writer, title):
+    def _create_summary_sheet(self, summary, writer, title):
         """Create summary sheet with key metrics"""
-        total_entries = len(entries)
-        total_minutes = sum(entry.minutes for entry in entries)
+        totals, type_breakdown = summary
+        total_entries, total_minutes, unique_users, unique_courtiers, unique_clients = totals
         total_hours = total_minutes / 60
         
-        # Get unique users and courtiers
-        unique_users = len(set(entry.user_id for entry in entries))
-        unique_courtiers = len(set(entry.courtier_id for entry in entries))
-        unique_clients = len(set(entry.client_name for entry in entries if entry.client_name))
-        
         # Average per entry
         avg_minutes = total_minutes / total_entries if total_entries > 0 else 0
         
-        # By type d'acte
-        type_breakdown = {}
-        for entry in entries:
-            type_breakdown[entry.type_dacte] = type_breakdown.get(entry.type_dacte, 0) + entry.minutes
-        
         # Create summary data
         summary_data = [
             ['Metric', 'Value'],
@@ -149,282 +403,119 @@ class ExcelExporter:
             ['Breakdown by Type d\'acte', ''],
         ]
         
-        for type_dacte, minutes in type_breakdown.items():
-            summary_data.append([f'  {type_dacte}', f'{minutes:,} min ({minutes/total_minutes*100:.1f}%)'])
+        for type_dacte, minutes in type_breakdown:
+            share = minutes / total_minutes * 100 if total_minutes else 0
+            summary_data.append([f'  {type_dacte}', f'{minutes:,} min ({share:.1f}%)'])
         
-        df_summary = pd.DataFrame(summary_data)
-        df_summary.to_excel(writer, sheet_name='Summary', index=False, header=False)
+        worksheet = _add_worksheet(writer, 'Summary', summary_data)
         
         # Format the sheet
-        worksheet = writer.sheets['Summary']
-        worksheet.column_dimensions['A'].width = 25
-        worksheet.column_dimensions['B'].width = 20
+        _set_column_width(worksheet, 0, 25)
+        _set_column_width(worksheet, 1, 20)
     
     def _create_entries_sheet(self, entries, writer):
         """Create detailed entries sheet"""
-        entries_data = []
-        for entry in entries:
-            entries_data.append({
-                'Date': entry.date.strftime('%Y-%m-%d'),
-                'Time': entry.time.strftime('%H:%M:%S'),
-                'User': entry.user.full_name,
-                'Courtier': entry.courtier.name,
-                'Minutes': entry.minutes,
-                'Hours': entry.minutes / 60,
-                'Type d\'acte': entry.type_dacte,
-                'Acte de gestion': entry.acte_de_gestion or '',
-                'Dossier': entry.dossier or '',
-                'Client Name': entry.client_name or '',
-                'Description': entry.description or ''
-            })
-        
-        df_entries = pd.DataFrame(entries_data)
+        df_entries = pd.DataFrame({
+            'Date': entries['date'].dt.date,  # date, not Timestamp: openpyxl ignores datetime_format
+            'Time': entries['time'].astype(str).str[:8],  # HH:MM:SS, dropping any microseconds
+            'User': entries['user'],
+            'Courtier': entries['courtier'],
+            'Minutes': entries['minutes'],
+            'Hours': entries['minutes'] / 60,
+            'Type d\'acte': entries['type_dacte'],
+            'Acte de gestion': entries['acte_de_gestion'].fillna(''),
+            'Dossier': entries['dossier'].fillna(''),
+            'Client Name': entries['client_name'].fillna(''),
+            'Description': entries['description'].fillna('')
+        })
         df_entries.to_excel(writer, sheet_name='Detailed Entries', index=False)
         
-        # Auto-adjust column widths
+        # Auto-adjust column widths from the frame, rather than visiting every written cell
         worksheet = writer.sheets['Detailed Entries']
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
+        max_lengths = df_entries.astype(str).apply(lambda column: column.str.len().max())
+        header_lengths = df_entries.columns.str.len()
+        for index, (max_length, header_length) in enumerate(zip(max_lengths, header_lengths)):
+            _set_column_width(worksheet, index, min(max(max_length, header_length) + 2, 50))
     
-    def _create_user_summary_sheet(self, entries, writer):
+    def _create_user_summary_sheet(self, rows, writer):
         """Create user summary sheet"""
-        user_stats = {}
-        for entry in entries:
-            user_id = entry.user_id
-            if user_id not in user_stats:
-                user_stats[user_id] = {
-                    'name': entry.user.full_name,
-                    'entries': 0,
-                    'minutes': 0,
-                    'type_dactes': {}
-                }
-            
-            user_stats[user_id]['entries'] += 1
-            user_stats[user_id]['minutes'] += entry.minutes
-            
-            type_dacte = entry.type_dacte
-            if type_dacte not in user_stats[user_id]['type_dactes']:
-                user_stats[user_id]['type_dactes'][type_dacte] = 0
-            user_stats[user_id]['type_dactes'][type_dacte] += entry.minutes
+        # One row per (user, type d'acte), folded into one line per user
+        df = pd.DataFrame(rows, columns=['user_id', 'User', 'type_dacte', 'entries', 'minutes'])
         
-        user_data = []
-        for user_id, stats in user_stats.items():
-            user_data.append({
-                'User': stats['name'],
-                'Total Entries': stats['entries'],
-                'Total Minutes': stats['minutes'],
-                'Total Hours': stats['minutes'] / 60,
-                'Avg Minutes/Entry': stats['minutes'] / stats['entries'],
-                'Appel téléphonique': stats['type_dactes'].get('Appel téléphonique', 0),
-                'Rendez-vous': stats['type_dactes'].get('Rendez-vous', 0),
-                'Email': stats['type_dactes'].get('Email', 0),
-                'Autre': stats['type_dactes'].get('Autre', 0)
-            })
+        df_users = df.groupby('user_id', sort=False).agg(**{
+            'User': ('User', 'first'),
+            'Total Entries': ('entries', 'sum'),
+            'Total Minutes': ('minutes', 'sum')
+        })
+        df_users['Total Hours'] = df_users['Total Minutes'] / 60
+        df_users['Avg Minutes/Entry'] = df_users['Total Minutes'] / df_users['Total Entries']
         
-        # Sort by total minutes descending
-        user_data.sort(key=lambda x: x['Total Minutes'], reverse=True)
+        # Minutes per type d'acte, one column for each value of the enum
+        by_type = df.set_index(['user_id', 'type_dacte'])['minutes'].unstack(fill_value=0)
+        df_users = df_users.join(by_type.reindex(columns=TYPE_DACTE_VALUES, fill_value=0))
         
-        df_users = pd.DataFrame(user_data)
+        # Sort by total minutes descending
+        df_users = df_users.sort_values('Total Minutes', ascending=False, kind='stable')
         df_users.to_excel(writer, sheet_name='By User', index=False)
     
-    def _create_courtier_summary_sheet(self, entries, writer):
+    def _create_courtier_summary_sheet(self, rows, writer):
         """Create courtier summary sheet"""
-        courtier_stats = {}
-        for entry in entries:
-            courtier_id = entry.courtier_id
-            if courtier_id not in courtier_stats:
-                courtier_stats[courtier_id] = {
-                    'name': entry.courtier.name,
-                    'entries': 0,
-                    'minutes': 0,
-                    'users': set()
-                }
-            
-            courtier_stats[courtier_id]['entries'] += 1
-            courtier_stats[courtier_id]['minutes'] += entry.minutes
-            courtier_stats[courtier_id]['users'].add(entry.user.full_name)
-        
-        courtier_data = []
-        for courtier_id, stats in courtier_stats.items():
-            courtier_data.append({
-                'Courtier': stats['name'],
-                'Total Entries': stats['entries'],
-                'Total Minutes': stats['minutes'],
-                'Total Hours': stats['minutes'] / 60,
-                'Unique Users': len(stats['users']),
-                'Users': ', '.join(stats['users'])
-            })
+        # One row per (courtier, user), folded into one line per courtier
+        df = pd.DataFrame(rows, columns=['courtier_id', 'Courtier', 'user_id', 'user_name', 'entries', 'minutes'])
+        
+        # Users are counted by id, two people sharing a name are still two users
+        df_courtiers = df.groupby('courtier_id', sort=False).agg(**{
+            'Courtier': ('Courtier', 'first'),
+            'Total Entries': ('entries', 'sum'),
+            'Total Minutes': ('minutes', 'sum'),
+            'Unique Users': ('user_id', 'nunique')
+        })
+        df_courtiers.insert(3, 'Total Hours', df_courtiers['Total Minutes'] / 60)
+        df_courtiers['Users'] = df.drop_duplicates(['courtier_id', 'user_name']).groupby(
+            'courtier_id', sort=False
+        )['user_name'].agg(', '.join)
         
         # Sort by total minutes descending
-        courtier_data.sort(key=lambda x: x['Total Minutes'], reverse=True)
-        
-        df_courtiers = pd.DataFrame(courtier_data)
+        df_courtiers = df_courtiers.sort_values('Total Minutes', ascending=False, kind='stable')
         df_courtiers.to_excel(writer, sheet_name='By Courtier', index=False)
     
-    def _create_type_dacte_summary_sheet(self, entries, writer):
+    def _create_type_dacte_summary_sheet(self, rows, writer):
         """Create type d'acte summary sheet"""
-        type_stats = {}
-        for entry in entries:
-            type_dacte = entry.type_dacte
-            if type_dacte not in type_stats:
-                type_stats[type_dacte] = {
-                    'entries': 0,
-                    'minutes': 0,
-                    'users': set(),
-                    'courtiers': set()
-                }
-            
-            type_stats[type_dacte]['entries'] += 1
-            type_stats[type_dacte]['minutes'] += entry.minutes
-            type_stats[type_dacte]['users'].add(entry.user.full_name)
-            type_stats[type_dacte]['courtiers'].add(entry.courtier.name)
-        
-        type_data = []
-        for type_dacte, stats in type_stats.items():
-            type_data.append({
-                'Type d\'acte': type_dacte,
-                'Total Entries': stats['entries'],
-                'Total Minutes': stats['minutes'],
-                'Total Hours': stats['minutes'] / 60,
-                'Unique Users': len(stats['users']),
-                'Unique Courtiers': len(stats['courtiers'])
-            })
-        
-        df_types = pd.DataFrame(type_data)
+        df_types = pd.DataFrame(rows, columns=['Type d\'acte', 'Total Entries', 'Total Minutes', 'Unique Users', 'Unique Courtiers'])
+        df_types.insert(3, 'Total Hours', df_types['Total Minutes'] / 60)
         df_types.to_excel(writer, sheet_name='By Type d\'acte', index=False)
     
-    def _create_daily_breakdown_sheet(self, entries, writer, period):
+    def _create_daily_breakdown_sheet(self, rows, writer, period):
         """Create daily breakdown for monthly report"""
-        daily_stats = {}
-        for entry in entries:
-            day_key = entry.date.strftime('%Y-%m-%d')
-            if day_key not in daily_stats:
-                daily_stats[day_key] = {
-                    'date': entry.date,
-                    'entries': 0,
-                    'minutes': 0
-                }
-            
-            daily_stats[day_key]['entries'] += 1
-            daily_stats[day_key]['minutes'] += entry.minutes
-        
-        daily_data = []
-        for day_key, stats in daily_stats.items():
-            daily_data.append({
-                'Date': stats['date'].strftime('%Y-%m-%d'),
-                'Day': stats['date'].strftime('%A'),
-                'Entries': stats['entries'],
-                'Minutes': stats['minutes'],
-                'Hours': stats['minutes'] / 60
-            })
-        
-        # Sort by date
-        daily_data.sort(key=lambda x: x['Date'])
-        
-        df_daily = pd.DataFrame(daily_data)
+        df_daily = pd.DataFrame(rows, columns=['Date', 'Entries', 'Minutes'])
+        dates = pd.to_datetime(df_daily['Date'])
+        df_daily['Date'] = dates.dt.strftime('%Y-%m-%d')
+        df_daily.insert(1, 'Day', dates.dt.day_name())
+        df_daily['Hours'] = df_daily['Minutes'] / 60
         df_daily.to_excel(writer, sheet_name='Daily Breakdown', index=False)
     
-    def _create_monthly_breakdown_sheet(self, entries, writer, year):
+    def _period_totals(self, rows):
+        """Entries and minutes per month, indexed by month start in calendar order"""
+        df = pd.DataFrame(rows, columns=['period', 'Entries', 'Minutes'])
+        return df.set_index(pd.to_datetime(df.pop('period'), format='%Y%m'))
+    
+    def _create_monthly_breakdown_sheet(self, monthly, writer, year):
         """Create monthly breakdown for yearly report"""
-        monthly_stats = {}
-        for entry in entries:
-            month_key = entry.date.strftime('%Y-%m')
-            if month_key not in monthly_stats:
-                monthly_stats[month_key] = {
-                    'entries': 0,
-                    'minutes': 0
-                }
-            
-            monthly_stats[month_key]['entries'] += 1
-            monthly_stats[month_key]['minutes'] += entry.minutes
-        
-        monthly_data = []
-        for month_key, stats in monthly_stats.items():
-            month_date = datetime.strptime(month_key, '%Y-%m')
-            monthly_data.append({
-                'Month': month_date.strftime('%B %Y'),
-                'Entries': stats['entries'],
-                'Minutes': stats['minutes'],
-                'Hours': stats['minutes'] / 60
-            })
-        
-        # Sort by month
-        monthly_data.sort(key=lambda x: x['Month'])
-        
-        df_monthly = pd.DataFrame(monthly_data)
+        df_monthly = monthly.reset_index(drop=True)
+        df_monthly.insert(0, 'Month', monthly.index.strftime('%B %Y'))
+        df_monthly['Hours'] = df_monthly['Minutes'] / 60
         df_monthly.to_excel(writer, sheet_name='Monthly Breakdown', index=False)
     
-    def _create_quarterly_breakdown_sheet(self, entries, writer, year):
+    def _create_quarterly_breakdown_sheet(self, monthly, writer, year):
         """Create quarterly breakdown for yearly report"""
-        quarterly_stats = {}
-        for entry in entries:
-            quarter = (entry.date.month - 1) // 3 + 1
-            quarter_key = f'{year} Q{quarter}'
-            if quarter_key not in quarterly_stats:
-                quarterly_stats[quarter_key] = {
-                    'entries': 0,
-                    'minutes': 0
-                }
-            
-            quarterly_stats[quarter_key]['entries'] += 1
-            quarterly_stats[quarter_key]['minutes'] += entry.minutes
-        
-        quarterly_data = []
-        for quarter_key, stats in quarterly_stats.items():
-            quarterly_data.append({
-                'Quarter': quarter_key,
-                'Entries': stats['entries'],
-                'Minutes': stats['minutes'],
-                'Hours': stats['minutes'] / 60
-            })
-        
-        df_quarterly = pd.DataFrame(quarterly_data)
+        # Grouping rather than resampling keeps quarters without entries out of the sheet
+        quarters = (f'{year} Q' + monthly.index.quarter.astype(str)).rename('Quarter')
+        df_quarterly = monthly.groupby(quarters, sort=False)[['Entries', 'Minutes']].sum().reset_index()
+        df_quarterly['Hours'] = df_quarterly['Minutes'] / 60
         df_quarterly.to_excel(writer, sheet_name='Quarterly Breakdown', index=False)
     
-    def _create_top_clients_sheet(self, entries, writer):
+    def _create_top_clients_sheet(self, rows, writer):
         """Create top clients sheet"""
-        client_stats = {}
-        for entry in entries:
-            if not entry.client_name:
-                continue
-                
-            client_name = entry.client_name
-            if client_name not in client_stats:
-                client_stats[client_name] = {
-                    'entries': 0,
-                    'minutes': 0,
-                    'users': set(),
-                    'courtiers': set()
-                }
-            
-            client_stats[client_name]['entries'] += 1
-            client_stats[client_name]['minutes'] += entry.minutes
-            client_stats[client_name]['users'].add(entry.user.full_name)
-            client_stats[client_name]['courtiers'].add(entry.courtier.name)
-        
-        client_data = []
-        for client_name, stats in client_stats.items():
-            client_data.append({
-                'Client Name': client_name,
-                'Total Entries': stats['entries'],
-                'Total Minutes': stats['minutes'],
-                'Total Hours': stats['minutes'] / 60,
-                'Unique Users': len(stats['users']),
-                'Unique Courtiers': len(stats['courtiers'])
-            })
-        
-        # Sort by total minutes descending and take top 50
-        client_data.sort(key=lambda x: x['Total Minutes'], reverse=True)
-        client_data = client_data[:50]
-        
-        df_clients = pd.DataFrame(client_data)
+        df_clients = pd.DataFrame(rows, columns=['Client Name', 'Total Entries', 'Total Minutes', 'Unique Users', 'Unique Courtiers'])
+        df_clients.insert(3, 'Total Hours', df_clients['Total Minutes'] / 60)
         df_clients.to_excel(writer, sheet_name='Top Clients', index=False)
\ No newline at end of file
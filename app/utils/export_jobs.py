@@ -0,0 +1,95 @@
+"""
+Background Excel export jobs so report generation never blocks a request
+"""
+import threading
+import time
+import uuid
+from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PERIODS = ('daily', 'monthly', 'yearly')
+
+EXPORT_JOB_TTL = 3600  # Seconds a finished job stays pollable and downloadable
+
+# Job state lives in this process: status and downloads only work against the worker
+# that started the job, so deployments serve the app from a single worker
+_jobs = {}
+_lock = threading.Lock()
+
+def generate_export(period, offload=None):
+    """Build the Excel report for a period and return its filename"""
+    from app.utils.export import ExcelExporter
+    
+    exporter = ExcelExporter(offload) if offload else ExcelExporter()
+    today = date.today()
+    
+    if period == 'daily':
+        return exporter.export_daily_report(today)
+    if period == 'monthly':
+        return exporter.export_monthly_report(today.strftime('%Y%m'))
+    if period == 'yearly':
+        return exporter.export_yearly_report(today.year)
+    raise ValueError(f"Invalid export period: {period}")
+
+def start_export(app, socketio, period, user_id):
+    """Queue an export and return the job id to poll"""
+    job_id = uuid.uuid4().hex
+    with _lock:
+        _prune_finished_jobs()
+        _jobs[job_id] = {'status': 'pending', 'period': period, 'user_id': user_id,
+                         'filename': None, 'error': None, 'finished_at': None}
+    
+    socketio.start_background_task(_run_export, app, socketio, job_id)
+    return job_id
+
+def get_export_job(job_id):
+    """Get a copy of a job's state, or None if unknown"""
+    with _lock:
+        _prune_finished_jobs()
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def _prune_finished_jobs():
+    """Forget jobs finished more than EXPORT_JOB_TTL ago, called with _lock held"""
+    cutoff = time.monotonic() - EXPORT_JOB_TTL
+    expired = [job_id for job_id, job in _jobs.items()
+               if job['finished_at'] is not None and job['finished_at'] < cutoff]
+    for job_id in expired:
+        del _jobs[job_id]
+
+def _run_export(app, socketio, job_id):
+    """Generate the report off the request path and notify the requester"""
+    with _lock:
+        job = _jobs[job_id]
+        job['status'] = 'running'
+    
+    try:
+        filename = _generate_in_context(app, job['period'])
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        with _lock:
+            job.update(status='error', error=str(e), finished_at=time.monotonic())
+        return
+    
+    with _lock:
+        job.update(status='done', filename=filename, finished_at=time.monotonic())
+    
+    socketio.emit('export_ready', {'job_id': job_id, 'filename': filename},
+                  to=f"user_{job['user_id']}")
+
+def _generate_in_context(app, period):
+    # Queries stay on this (green) thread: SQLAlchemy's pool and session locks are
+    # green under eventlet and deadlock when taken from a tpool OS thread
+    with app.app_context():
+        return generate_export(period, offload=_off_hub)
+
+def _off_hub(func, *args):
+    """Run CPU-bound work that never touches the database on a real OS thread under eventlet"""
+    from app import SOCKETIO_ASYNC_MODE
+    
+    if SOCKETIO_ASYNC_MODE == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args)
+    return func(*args)
@@ -0,0 +1,72 @@
+"""
+orjson-backed JSON helpers, falling back to the standard library
+"""
+import json
+import decimal
+import uuid
+from flask import jsonify, Response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonCodec:
+    """json-module lookalike for python-socketio's packet encoder"""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # Socket.IO passes stdlib-only options such as separators; orjson is compact already
+        return orjson.dumps(obj).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backing jsonify() and request.get_json() with orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return _orjson_dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        # The session serializer untags values with object_hook, which orjson lacks
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping a decode/encode
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(_orjson_dumps(obj), mimetype='application/json')
+
+def _orjson_dumps(obj):
+    # Non-string keys, e.g. user ids, are allowed by the stdlib encoder too
+    return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+def _orjson_default(obj):
+    """Types orjson leaves to the caller, encoded as Flask's default provider does"""
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Codec for SocketIO(json=...), None keeps the default encoder
+socketio_json = OrjsonCodec if orjson else None
+
+# Provider for app.json, None keeps Flask's default
+json_provider = OrjsonProvider if orjson else None
+
+def json_response(payload):
+    """Build a JSON response, encoded with orjson when it is installed"""
+    if orjson:
+        return Response(_orjson_dumps(payload), mimetype='application/json')
+    return jsonify(payload)
+
+def ndjson_line(obj):
+    """Encode one newline-delimited JSON record"""
+    if orjson:
+        return orjson.dumps(obj) + b'\n'
+    return json.dumps(obj).encode() + b'\n'
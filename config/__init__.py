@@ -3,9 +3,11 @@ Configuration package for WikiDesk application
 """
 
 import os
+from functools import lru_cache
 from pathlib import Path
 
 # Ensure database is in correct location
+@lru_cache(maxsize=1)
 def get_database_uri():
     """Get the correct database URI for WikiDesk"""
     # Check if environment variable is set (from run_simple.py)
@@ -19,13 +21,21 @@ def get_database_uri():
     db_path = db_dir / "minutes_tracker.db"
     return f'sqlite:///{str(db_path)}'
 
+class _DefaultDatabaseUri:
+    """Resolve the shared database location only when a config actually reads it"""
+    def __get__(self, instance, owner):
+        return get_database_uri()
+
 # Default configuration classes
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'wikiDesk-secret-key-2024'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_DATABASE_URI = get_database_uri()
+    SQLALCHEMY_DATABASE_URI = _DefaultDatabaseUri()  # Overridden by every concrete config below
     BACKUP_PATH = 'backups'
+    BACKUP_COMPRESS_LEVEL = int(os.environ.get('BACKUP_COMPRESS_LEVEL', 1))  # Fast over small, 1-9
+    PG_DUMP_JOBS = int(os.environ.get('PG_DUMP_JOBS', 1))  # >1 dumps PostgreSQL tables in parallel
+    SQLITE_FULL_BACKUP_DAYS = int(os.environ.get('SQLITE_FULL_BACKUP_DAYS', 7))  # Scheduled SQLite backups are page diffs in between
     EXPORT_PATH = 'exports' 
     WTF_CSRF_ENABLED = False
 
@@ -5,12 +5,14 @@ import os
 import json
 import socket
 from pathlib import Path
+from config.network import get_local_ip
 
 class DeploymentConfig:
     def __init__(self):
         self.config_dir = Path.home() / ".wikiDesk"
         self.config_file = self.config_dir / "config.json"
         self.config_dir.mkdir(exist_ok=True)
+        self._config_cache = None  # (mtime, parsed config)
         
     def create_config(self, server_ip, server_port, db_host, db_port, db_name, db_user, db_password, user_role):
         """Create configuration file for client installation"""
@@ -45,11 +47,16 @@ class DeploymentConfig:
         return config
     
     def load_config(self):
-        """Load existing configuration"""
-        if self.config_file.exists():
+        """Load existing configuration, parsed again only when the file changes"""
+        try:
+            mtime = self.config_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        
+        if self._config_cache is None or self._config_cache[0] != mtime:
             with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
+                self._config_cache = (mtime, json.load(f))
+        return self._config_cache[1]
     
     def get_database_url(self):
         """Get database URL for SQLAlchemy"""
@@ -79,14 +86,7 @@ class DeploymentConfig:
     
     def get_local_ip(self):
         """Get local IP address"""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "127.0.0.1"
+        return get_local_ip()
 
 # Configuration for different deployment modes
 class NetworkConfig:
@@ -0,0 +1,27 @@
+"""
+Network helpers shared by the deployment configurations
+"""
+import socket
+import time
+
+LOCAL_IP_TTL = 60  # Seconds, so a laptop moving between networks is noticed
+
+_local_ip = None  # (expires at, address)
+
+def get_local_ip():
+    """Get local IP address, looked up at most once per LOCAL_IP_TTL"""
+    global _local_ip
+    now = time.monotonic()
+    if _local_ip is not None and _local_ip[0] > now:
+        return _local_ip[1]
+    
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            address = s.getsockname()[0]
+    except OSError:
+        # Not cached, the network may come up later
+        return "127.0.0.1"
+    
+    _local_ip = (now + LOCAL_IP_TTL, address)
+    return address
@@ -6,16 +6,26 @@ import os
 import json
 import socket
 from pathlib import Path
+from config.network import get_local_ip
 
 class SimpleDeploymentConfig:
     def __init__(self):
         self.config_dir = Path.home() / ".wikiDesk"
         self.config_file = self.config_dir / "config.json"
         self.config_dir.mkdir(exist_ok=True)
+        self._config_cache = None  # (mtime, parsed config)
         
         # Use a shared network SQLite database
-        self.shared_db_dir = self.find_shared_location()
+        self.shared_db_dir = self.saved_shared_location() or self.find_shared_location()
         
+    def saved_shared_location(self):
+        """Shared location recorded by create_config, if it is still writable"""
+        config = self.load_config()
+        location = config.get("database", {}).get("shared_location") if config else None
+        if location and os.access(location, os.W_OK):
+            return Path(location)
+        return None
+    
     def find_shared_location(self):
         """Find or create a shared network location for the database"""
         possible_locations = [
@@ -79,11 +89,16 @@ class SimpleDeploymentConfig:
         return config
     
     def load_config(self):
-        """Load existing configuration"""
-        if self.config_file.exists():
+        """Load existing configuration, parsed again only when the file changes"""
+        try:
+            mtime = self.config_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        
+        if self._config_cache is None or self._config_cache[0] != mtime:
             with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
+                self._config_cache = (mtime, json.load(f))
+        return self._config_cache[1]
     
     def get_database_url(self):
         """Get database URL for SQLAlchemy (SQLite)"""
@@ -113,14 +128,7 @@ class SimpleDeploymentConfig:
     
     def get_local_ip(self):
         """Get local IP address"""
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "127.0.0.1"
+        return get_local_ip()
 
 # Global configuration instance
 simple_deployment_config = SimpleDeploymentConfig()
\ No newline at end of file
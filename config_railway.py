@@ -4,43 +4,58 @@ Supports both SQLite (local) and PostgreSQL (Railway)
 """
 
 import os
+import re
 from datetime import timedelta
+from types import MappingProxyType
+from urllib.parse import parse_qs, urlsplit
+
+# Set by Railway on its containers, read once per process
+RAILWAY_ENVIRONMENT = os.environ.get('RAILWAY_ENVIRONMENT')
+ON_RAILWAY = bool(RAILWAY_ENVIRONMENT)  # What get_config() and the secure cookies both go by
+_SECRET_KEY = os.environ.get('SECRET_KEY')
+
+# Project root, where the local database and the data folders live; abspath rather than
+# realpath so a symlinked release directory keeps its data under the stable link
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+_POSTGRES_SCHEME_RE = re.compile(r'^postgres://')
+
+def normalize_db_url(url):
+    """Rewrite Heroku-style postgres:// URLs to the postgresql:// scheme SQLAlchemy expects"""
+    return _POSTGRES_SCHEME_RE.sub('postgresql://', url, count=1) if url else url
+
+def require_ssl(url):
+    """Pin sslmode=require on a PostgreSQL URL that does not choose its own mode"""
+    # Railway's databases always speak SSL, skip libpq's plaintext fallback negotiation
+    if not url or not url.startswith('postgresql') or 'sslmode' in parse_qs(urlsplit(url).query):
+        return url
+    return f"{url}{'&' if urlsplit(url).query else '?'}sslmode=require"
 
 class Config:
     """Base configuration"""
     
     # Security
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production-xyz789'
+    SECRET_KEY = _SECRET_KEY or 'dev-secret-key-change-in-production-xyz789'
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = None
     
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
-    SESSION_COOKIE_SECURE = os.environ.get('RAILWAY_ENVIRONMENT') is not None
+    SESSION_COOKIE_SECURE = ON_RAILWAY
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
     # Database configuration - auto-detect Railway PostgreSQL
-    DATABASE_URL = os.environ.get('DATABASE_URL')
+    DATABASE_URL = require_ssl(normalize_db_url(os.environ.get('DATABASE_URL')))
     if DATABASE_URL:
         # Railway PostgreSQL
-        # Fix for SQLAlchemy (replace postgres:// with postgresql://)
-        if DATABASE_URL.startswith('postgres://'):
-            DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
         SQLALCHEMY_DATABASE_URI = DATABASE_URL
-        print(f"[INFO] Using PostgreSQL database (Railway): {DATABASE_URL[:50]}...")
     else:
         # Local SQLite
-        basedir = os.path.abspath(os.path.dirname(__file__))
-        SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(basedir, "minutes_tracker.db")}'
-        print("[INFO] Using SQLite database (Local)")
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.join(BASE_DIR, "minutes_tracker.db")}'
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 10,
-        'pool_recycle': 3600,
-        'pool_pre_ping': True
-    }
+    # Pool options come from create_app(), tuned per database driver
     
     # Application settings
     APP_NAME = 'WikiDesk'
@@ -48,25 +63,28 @@ class Config:
     
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
-    UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
-    ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'xlsx', 'xls', 'csv'}
+    UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+    ALLOWED_EXTENSIONS = frozenset({'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'xlsx', 'xls', 'csv'})  # Lowercase, without the dot
     
     # Export settings
-    EXPORT_FOLDER = os.path.join(os.path.dirname(__file__), 'exports')
+    EXPORT_FOLDER = os.path.join(BASE_DIR, 'exports')
     
     # Backup settings (local only)
-    BACKUP_FOLDER = os.path.join(os.path.dirname(__file__), 'backups')
-    BACKUP_ENABLED = os.environ.get('DATABASE_URL') is None  # Only for local SQLite
+    BACKUP_FOLDER = os.path.join(BASE_DIR, 'backups')
+    BACKUP_ENABLED = DATABASE_URL is None  # Only for local SQLite
     
-    # SocketIO settings
-    SOCKETIO_ASYNC_MODE = 'threading'
+    # SocketIO settings, wsgi.py switches to eventlet before the app is imported
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
     
-    @staticmethod
-    def init_app(app):
+    @classmethod
+    def init_app(cls, app):
         """Initialize application"""
-        # Create necessary directories
-        for folder in [Config.UPLOAD_FOLDER, Config.EXPORT_FOLDER, Config.BACKUP_FOLDER]:
-            os.makedirs(folder, exist_ok=True)
+        # Create necessary directories, a single stat when they already exist
+        for folder in (cls.UPLOAD_FOLDER, cls.EXPORT_FOLDER, cls.BACKUP_FOLDER):
+            if not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+        
+        app.logger.info('Using %s database', 'PostgreSQL (Railway)' if cls.DATABASE_URL else 'SQLite (Local)')
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -79,34 +97,28 @@ class ProductionConfig(Config):
     TESTING = False
     
     # Use environment variables in production
-    SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32).hex()
+    SECRET_KEY = _SECRET_KEY or os.urandom(32).hex()
     
     # Security headers
     SEND_FILE_MAX_AGE_DEFAULT = 31536000  # 1 year
     
     @classmethod
     def init_app(cls, app):
-        Config.init_app(app)
-        
-        # Log to stdout in production
+        # Flask's default handler already writes to stderr, only let INFO through
         import logging
-        from logging import StreamHandler
-        stream_handler = StreamHandler()
-        stream_handler.setLevel(logging.INFO)
-        app.logger.addHandler(stream_handler)
         app.logger.setLevel(logging.INFO)
+        
+        super().init_app(app)
         app.logger.info('WikiDesk startup')
 
-# Configuration dictionary
-config = {
+# Configuration dictionary, read-only since every app in the process shares it
+config = MappingProxyType({
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig
-}
+})
 
 # Auto-select configuration based on environment
 def get_config():
     """Get configuration based on environment"""
-    if os.environ.get('RAILWAY_ENVIRONMENT'):
-        return ProductionConfig
-    return DevelopmentConfig
\ No newline at end of file
+    return config['production' if ON_RAILWAY else 'development']
\ No newline at end of file
@@ -8,12 +8,15 @@ print(f"DATABASE_URL: {os.environ.get('DATABASE_URL', 'NOT SET')}")
 print(f"PORT: {os.environ.get('PORT', 'NOT SET')}")
 print(f"RAILWAY_ENVIRONMENT: {os.environ.get('RAILWAY_ENVIRONMENT', 'NOT SET')}")
 
+KEYWORDS = ('DATABASE', 'POSTGRES', 'RAILWAY', 'PORT')
+
 print("\n=== ALL ENVIRONMENT VARIABLES ===")
-for key, value in sorted(os.environ.items()):
-    if any(keyword in key.upper() for keyword in ['DATABASE', 'POSTGRES', 'RAILWAY', 'PORT']):
-        if 'PASSWORD' in key.upper():
-            print(f"{key}: ***HIDDEN***")
-        else:
-            print(f"{key}: {value}")
+# Filter first, only the few matching variables get sorted
+relevant = [(key, value) for key, value in os.environ.items() if any(keyword in key.upper() for keyword in KEYWORDS)]
+for key, value in sorted(relevant):
+    if 'PASSWORD' in key.upper():
+        print(f"{key}: ***HIDDEN***")
+    else:
+        print(f"{key}: {value}")
 
 print("\n=== END DEBUG ===")
\ No newline at end of file
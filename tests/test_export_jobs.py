@@ -0,0 +1,54 @@
+"""
+Background export jobs under eventlet, run in a child process so monkey-patching
+stays out of the test runner
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONCURRENT_JOBS = textwrap.dedent('''
+    import eventlet
+    eventlet.monkey_patch()
+    
+    import os, sys, tempfile
+    from datetime import date
+    os.environ['SOCKETIO_ASYNC_MODE'] = 'eventlet'
+    sys.path.insert(0, sys.argv[1])
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    
+    from app import create_app, db, socketio
+    from config import TestingConfig
+    from app.models.user import User
+    from app.models.courtier import Courtier
+    from app.models.entry import Entry
+    from app.utils.export_jobs import start_export, get_export_job
+    
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(workdir, 'test.db')
+    
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        user, courtier = User('u', 'u@example.com', 'User', 'pw'), Courtier('AXA')
+        db.session.add_all([user, courtier])
+        db.session.commit()
+        user_id = user.id
+        db.session.add_all([Entry(user.id, courtier.id, 5, 'Production', entry_date=date.today())
+                            for _ in range(500)])
+        db.session.commit()
+    
+    jobs = [start_export(app, socketio, period, user_id) for period in ('daily', 'daily', 'monthly', 'yearly')]
+    while not all(get_export_job(job)['status'] in ('done', 'error') for job in jobs):
+        eventlet.sleep(0.05)
+    print([get_export_job(job)['status'] for job in jobs])
+''')
+
+def test_concurrent_exports_finish_under_eventlet():
+    result = subprocess.run([sys.executable, '-c', CONCURRENT_JOBS, ROOT],
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "['done', 'done', 'done', 'done']"
@@ -3,17 +3,23 @@ WSGI entry point for Railway deployment
 Forces PostgreSQL usage and proper production configuration
 """
 
+# Green sockets/threads must be patched in before anything else is imported
+import eventlet
+eventlet.monkey_patch()
+
 import os
 import sys
-from pathlib import Path
+
+# One green thread per client instead of Werkzeug's thread per request
+os.environ.setdefault('SOCKETIO_ASYNC_MODE', 'eventlet')
 
 # Force Railway environment variables
 os.environ['RAILWAY_ENVIRONMENT'] = 'true'
 os.environ['FLASK_ENV'] = 'production'
 
 # Add the app directory to Python path
-app_dir = Path(__file__).parent
-sys.path.insert(0, str(app_dir))
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, _HERE)
 
 print("[WSGI] Starting WikiDesk for Railway...")
 
@@ -38,97 +44,30 @@ if not DATABASE_URL:
             print(f"[WSGI] Constructed DATABASE_URL from PostgreSQL vars")
 
 if DATABASE_URL:
-    # Fix postgres:// to postgresql:// for SQLAlchemy
-    if DATABASE_URL.startswith('postgres://'):
-        DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
-        os.environ['DATABASE_URL'] = DATABASE_URL
+    # Fix postgres:// to postgresql:// for SQLAlchemy; imported only now since
+    # config_railway reads DATABASE_URL, possibly constructed above, on import
+    from config_railway import normalize_db_url
+    DATABASE_URL = normalize_db_url(DATABASE_URL)
+    os.environ['DATABASE_URL'] = DATABASE_URL
     print(f"[WSGI] PostgreSQL will be used: {DATABASE_URL[:50]}...")
 else:
     print("[WSGI] WARNING: No PostgreSQL found - will use SQLite")
     print("[WSGI] Available env vars:")
-    for key in sorted(os.environ.keys()):
-        if any(keyword in key.upper() for keyword in ['DATABASE', 'POSTGRES', 'PG']):
-            print(f"  {key}: {os.environ[key][:20]}..." if len(os.environ[key]) > 20 else f"  {key}: {os.environ[key]}")
-
-# Import after setting environment
-from app import create_app, socketio, db
-from app.models.user import User
-from app.models.courtier import Courtier
-
-# Create app with explicit Railway config
-from config_railway import ProductionConfig
-app = create_app(config_class=ProductionConfig)
-
-def init_database():
-    """Initialize database with default data"""
-    with app.app_context():
-        try:
-            # Create all tables
-            db.create_all()
-            print("[WSGI] Tables created/verified")
-            
-            # Check if admin exists
-            admin = User.query.filter_by(username='admin').first()
-            if not admin:
-                # Create admin user
-                admin = User(
-                    username='admin',
-                    email='admin@wikidesk.local',
-                    full_name='Administrateur',
-                    password='admin123'
-                )
-                admin.role = 'admin'
-                admin.is_active = True
-                
-                db.session.add(admin)
-                db.session.commit()
-                print("[WSGI] Admin user created (admin/admin123)")
-            
-            # Create demo user if not exists
-            demo_user = User.query.filter_by(username='utilisateur').first()
-            if not demo_user:
-                demo_user = User(
-                    username='utilisateur',
-                    email='user@wikidesk.local',
-                    full_name='Utilisateur Demo',
-                    password='user123'
-                )
-                demo_user.role = 'user'
-                demo_user.is_active = True
-                
-                db.session.add(demo_user)
-                db.session.commit()
-                print("[WSGI] Demo user created (utilisateur/user123)")
-            
-            # Add default courtiers if none exist
-            if Courtier.query.count() == 0:
-                default_courtiers = [
-                    'AXA', 'Allianz', 'Generali', 'MAIF', 
-                    'MACIF', 'MMA', 'Groupama', 'Crédit Agricole', 'Autres'
-                ]
-                
-                for courtier_name in default_courtiers:
-                    courtier = Courtier(name=courtier_name)
-                    db.session.add(courtier)
-                
-                db.session.commit()
-                print(f"[WSGI] {len(default_courtiers)} default courtiers added")
-                
-        except Exception as e:
-            print(f"[WSGI] Database initialization error: {e}")
-
-# Initialize database
-init_database()
-
-print("[WSGI] WikiDesk initialized successfully")
-
-# For gunicorn
-application = app
+    relevant = [(key, value) for key, value in os.environ.items()
+                if any(keyword in key.upper() for keyword in ('DATABASE', 'POSTGRES', 'PG'))]
+    for key, value in sorted(relevant):
+        print(f"  {key}: {value[:20]}..." if len(value) > 20 else f"  {key}: {value}")
 
-# Always run the server when this file is executed (Railway calls python wsgi.py)
-port = int(os.environ.get('PORT', 5000))
-print(f"[WSGI] Starting WikiDesk on port {port}")
-print(f"[WSGI] Database: {'PostgreSQL (Railway)' if os.environ.get('DATABASE_URL') else 'SQLite (Local)'}")
+# Flask, SQLAlchemy and the models are imported on first use, so importing this
+# module stays cheap until the app is actually needed
+def __getattr__(name):
+    # For gunicorn: wsgi:application builds the app on first access
+    if name == 'application':
+        from app.bootstrap import create_application
+        return create_application()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Force the app to start
-socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
+# Railway calls python wsgi.py
+if __name__ == '__main__':
+    from app.bootstrap import main
+    main()